@@ -1,4 +1,5 @@
 import os
+from functools import cache
 
 import firebase_admin
 import gspread
@@ -22,10 +23,12 @@ def _get_credentials():
     return abs_key_path
 
 
+@cache
 def get_gspread_client_service_account():
     """
     Retorna um gspread.Client usando gspread.service_account.
     Requer o JSON da conta de serviço local (caminho obtido por _get_credentials()).
+    O cliente (e sua sessão HTTP autorizada) é criado uma única vez e reutilizado por todos os campi.
     """
     abs_key_path = _get_credentials()
     # gspread.service_account já cria credentials internamente
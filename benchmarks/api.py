@@ -0,0 +1,277 @@
+"""
+Benchmark das rotas da API sem acesso ao Firebase.
+
+A aplicação de endpoints.py roda com o Firestore falso (benchmarks/firestore_falso.py) povoado
+com dados sintéticos, e cada rota recebe uma carga com concorrência fixa. São medidos p50/p95/p99,
+requisições por segundo e leituras/chamadas ao Firestore por requisição, em cada modo de leitura:
+  firestore     consultas à coleção cardapios, com os alimentos vindos do catálogo
+  materializado consultas à coleção cardapios_completos
+  indice        índice em memória mantido pelos listeners
+  snapshot      arquivo gerado pelo scraper, mapeado em memória, sem Firestore (SNAPSHOT_CARDAPIOS)
+
+Os resultados são gravados em JSON; com --comparar, são confrontados com uma execução anterior
+e o processo termina com código 1 se alguma rota piorar além da tolerância.
+
+Além das dependências da API, precisa do httpx (cliente ASGI das requisições):
+    pip install -r benchmarks/requirements.txt
+
+Uso:
+    python -m benchmarks.api --latencia-ms 20 --requisicoes 300 --concorrencia 16
+    python -m benchmarks.api --comparar benchmarks/resultados/api-20250310-101500.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from benchmarks.dados_sinteticos import DadosSinteticos, gerar_dados, popular
+from benchmarks.firestore_falso import FirestoreFalso
+from benchmarks.registro import gravar_resultados
+from snapshot import escrever_snapshot
+
+MODOS = ("firestore", "materializado", "indice", "snapshot")
+
+# Cada rota gera as URLs a partir dos dados sintéticos, variando os parâmetros entre as requisições
+ROTAS: dict[str, Callable[[random.Random, DadosSinteticos], str]] = {
+    "cardapios": lambda aleatorio, dados: "/cardapios",
+    "cardapios_dia": lambda aleatorio, dados: (
+        f"/cardapios?campus={aleatorio.choice(dados.cardapios).campus.value}"
+        f"&data={aleatorio.choice(dados.cardapios).data.isoformat()}"
+    ),
+    # Todas as requisições iguais, como no horário de pico em que os alunos abrem o cardápio do dia
+    "cardapios_mesma_consulta": lambda aleatorio, dados: (
+        f"/cardapios?campus={dados.cardapios[0].campus.value}&data={dados.cardapios[0].data.isoformat()}"
+    ),
+    "cardapios_refeicao": lambda aleatorio, dados: _url_refeicao(aleatorio.choice(dados.cardapios)),
+    "cardapios_periodo": lambda aleatorio, dados: _url_periodo(aleatorio, dados),
+    "cardapios_multiplos": lambda aleatorio, dados: _url_multiplos(aleatorio, dados),
+    "cardapios_id": lambda aleatorio, dados: f"/cardapios/{aleatorio.choice(dados.cardapios).id}",
+    "cardapios_semana": lambda aleatorio, dados: (
+        "/cardapios/semana?semana={}-W{:02d}".format(*aleatorio.choice(dados.cardapios).data.isocalendar()[:2])
+    ),
+    "alimentos": lambda aleatorio, dados: "/alimentos",
+    "alimentos_id": lambda aleatorio, dados: f"/alimentos/{aleatorio.choice(dados.alimentos).id}",
+    "campi": lambda aleatorio, dados: "/campi",
+}
+
+
+def _url_periodo(aleatorio: random.Random, dados: DadosSinteticos) -> str:
+    inicio = aleatorio.choice(dados.cardapios).data
+    return f"/cardapios?data_inicio={inicio.isoformat()}&data_fim={(inicio + timedelta(days=6)).isoformat()}&limite=100"
+
+
+def _url_refeicao(cardapio) -> str:
+    """Uma refeição de um campus em um dia ("o almoço de hoje"), cujo ID é determinado pelos filtros."""
+    return f"/cardapios?campus={cardapio.campus.value}&data={cardapio.data.isoformat()}&tipo_refeicao={cardapio.tipo_refeicao.value}"
+
+
+def _url_multiplos(aleatorio: random.Random, dados: DadosSinteticos) -> str:
+    """Vários campi e os dois tipos de refeição em um período, como em um painel com vários restaurantes."""
+    campi = aleatorio.sample(sorted({cardapio.campus.value for cardapio in dados.cardapios}), 3)
+    inicio = aleatorio.choice(dados.cardapios).data
+    return (
+        "/cardapios?" + "&".join(f"campus={campus}" for campus in campi)
+        + f"&tipo_refeicao=almoco&tipo_refeicao=jantar&data_inicio={inicio.isoformat()}"
+        + f"&data_fim={(inicio + timedelta(days=6)).isoformat()}&limite=50"
+    )
+
+
+def _percentil(valores: list[float], percentil: int) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[percentil - 1]
+
+
+async def _medir_rota(
+        cliente: httpx.AsyncClient,
+        db: FirestoreFalso,
+        urls: list[str],
+        concorrencia: int,
+        cabecalhos: dict
+) -> dict:
+    latencias: list[float] = []
+    erros = 0
+    bytes_recebidos = 0
+    pendentes = iter(urls)
+
+    async def trabalhador():
+        nonlocal erros, bytes_recebidos
+        for url in pendentes:
+            inicio = time.perf_counter()
+            resposta = await cliente.get(url, headers=cabecalhos)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            bytes_recebidos += len(resposta.content)
+            if resposta.status_code >= 400:
+                erros += 1
+
+    db.zerar_contadores()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "requisicoes": len(urls),
+        "erros": erros,
+        "p50_ms": round(_percentil(latencias, 50), 3),
+        "p95_ms": round(_percentil(latencias, 95), 3),
+        "p99_ms": round(_percentil(latencias, 99), 3),
+        "media_ms": round(statistics.fmean(latencias), 3),
+        "requisicoes_por_segundo": round(len(urls) / duracao, 2),
+        "leituras_por_requisicao": round(db.leituras / len(urls), 2),
+        "chamadas_por_requisicao": round(db.chamadas / len(urls), 2),
+        "bytes_por_resposta": round(bytes_recebidos / len(urls)),
+    }
+
+
+async def executar_modo(modo: str, dados: DadosSinteticos, argumentos: argparse.Namespace) -> dict[str, dict]:
+    # Importado aqui para que o ambiente (INDICE_AO_VIVO etc.) já esteja definido
+    from endpoints import app, get_db
+
+    os.environ["INDICE_AO_VIVO"] = "1" if modo == "indice" else "0"
+    db = FirestoreFalso(argumentos.latencia_ms, argumentos.variacao_ms, semente=argumentos.semente)
+    popular(db, dados, materializar=modo == "materializado")
+
+    diretorio_snapshot = tempfile.TemporaryDirectory()
+    if modo == "snapshot":
+        caminho_snapshot = Path(diretorio_snapshot.name) / "cardapios.snapshot"
+        escrever_snapshot(
+            caminho_snapshot,
+            (cardapio.model_dump(mode="json") for cardapio in dados.cardapios),
+            (alimento.model_dump() for alimento in dados.alimentos)
+        )
+        os.environ["SNAPSHOT_CARDAPIOS"] = str(caminho_snapshot)
+
+    app.state.db = db
+    app.dependency_overrides[get_db] = lambda: db
+    aleatorio = random.Random(argumentos.semente)
+    cabecalhos = {"Accept-Encoding": argumentos.accept_encoding}
+
+    resultados = {}
+    try:
+        with redirect_stdout(StringIO()):
+            contexto = app.router.lifespan_context(app)
+            await contexto.__aenter__()
+        try:
+            transporte = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+                for rota, gerar_url in ROTAS.items():
+                    if argumentos.rotas and rota not in argumentos.rotas:
+                        continue
+                    aquecimento = [gerar_url(aleatorio, dados) for _ in range(argumentos.aquecimento)]
+                    await _medir_rota(cliente, db, aquecimento, argumentos.concorrencia, cabecalhos)
+                    urls = [gerar_url(aleatorio, dados) for _ in range(argumentos.requisicoes)]
+                    resultados[rota] = await _medir_rota(cliente, db, urls, argumentos.concorrencia, cabecalhos)
+                    _imprimir_linha(modo, rota, resultados[rota])
+        finally:
+            with redirect_stdout(StringIO()):
+                await contexto.__aexit__(None, None, None)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.state.db = None
+        os.environ.pop("SNAPSHOT_CARDAPIOS", None)
+        diretorio_snapshot.cleanup()
+    return resultados
+
+
+def _imprimir_linha(modo: str, rota: str, resultado: dict):
+    print(
+        f"{modo:<14}{rota:<20}"
+        f"{resultado['p50_ms']:>9.2f}{resultado['p95_ms']:>9.2f}{resultado['p99_ms']:>9.2f}"
+        f"{resultado['requisicoes_por_segundo']:>10.1f}{resultado['leituras_por_requisicao']:>10.1f}"
+        f"{resultado['chamadas_por_requisicao']:>9.2f}{resultado['erros']:>7}"
+    )
+
+
+def comparar(atual: dict, anterior: dict, tolerancia: float) -> list[str]:
+    """Lista as rotas cujo p95 aumentou ou cujas requisições por segundo caíram além da tolerância."""
+    regressoes = []
+    for modo, rotas in atual["resultados"].items():
+        for rota, resultado in rotas.items():
+            base = anterior.get("resultados", {}).get(modo, {}).get(rota)
+            if base is None:
+                continue
+            if resultado["p95_ms"] > base["p95_ms"] * (1 + tolerancia):
+                regressoes.append(f"{modo}/{rota}: p95 {base['p95_ms']:.2f} -> {resultado['p95_ms']:.2f} ms")
+            if resultado["requisicoes_por_segundo"] < base["requisicoes_por_segundo"] * (1 - tolerancia):
+                regressoes.append(
+                    f"{modo}/{rota}: {base['requisicoes_por_segundo']:.1f} -> "
+                    f"{resultado['requisicoes_por_segundo']:.1f} requisições/s"
+                )
+            if resultado["leituras_por_requisicao"] > base["leituras_por_requisicao"]:
+                regressoes.append(
+                    f"{modo}/{rota}: leituras por requisição {base['leituras_por_requisicao']} -> "
+                    f"{resultado['leituras_por_requisicao']}"
+                )
+    return regressoes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das rotas da API com um Firestore em memória.")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--rotas", nargs="+", choices=list(ROTAS), help="Rotas medidas (padrão: todas).")
+    parser.add_argument("--semestres", type=int, default=4)
+    parser.add_argument("--alimentos", type=int, default=400)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latência de cada chamada ao Firestore.")
+    parser.add_argument("--variacao-ms", type=float, default=5.0)
+    parser.add_argument("--requisicoes", type=int, default=300, help="Requisições medidas por rota.")
+    parser.add_argument("--aquecimento", type=int, default=20, help="Requisições descartadas antes de medir.")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--accept-encoding", default="br, gzip")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", type=Path, help="Arquivo JSON dos resultados (padrão: benchmarks/resultados/).")
+    parser.add_argument("--comparar", type=Path, help="Resultado anterior usado como referência.")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="Piora relativa aceita na comparação.")
+    argumentos = parser.parse_args()
+
+    dados = gerar_dados(argumentos.semestres, argumentos.alimentos, argumentos.semente)
+    print(
+        f"{len(dados.cardapios)} cardápios de {dados.inicio} a {dados.fim}, {len(dados.alimentos)} alimentos; "
+        f"latência {argumentos.latencia_ms} ± {argumentos.variacao_ms} ms, concorrência {argumentos.concorrencia}"
+    )
+    print(f"{'modo':<14}{'rota':<20}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>10}{'leituras':>10}{'chamadas':>9}{'erros':>7}")
+
+    resultados = {modo: asyncio.run(executar_modo(modo, dados, argumentos)) for modo in argumentos.modos}
+    execucao, saida = gravar_resultados(
+        "api",
+        {
+            "semestres": argumentos.semestres,
+            "alimentos": argumentos.alimentos,
+            "cardapios": len(dados.cardapios),
+            "latencia_ms": argumentos.latencia_ms,
+            "variacao_ms": argumentos.variacao_ms,
+            "requisicoes": argumentos.requisicoes,
+            "concorrencia": argumentos.concorrencia,
+            "accept_encoding": argumentos.accept_encoding,
+            "semente": argumentos.semente,
+        },
+        {"resultados": resultados},
+        argumentos.saida
+    )
+    print(f"Resultados gravados em {saida}")
+
+    if argumentos.comparar:
+        anterior = json.loads(argumentos.comparar.read_text(encoding="utf-8"))
+        regressoes = comparar(execucao, anterior, argumentos.tolerancia)
+        if regressoes:
+            print(f"Regressões em relação a {argumentos.comparar}:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            return 1
+        print(f"Sem regressões em relação a {argumentos.comparar}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Dados sintéticos (alimentos e cardápios de vários semestres, para todos os campi) para os benchmarks"""
+import dataclasses
+import random
+from datetime import date, timedelta
+from typing import Optional
+
+from modelos import Alimento, Campus, Cardapio, CardapioCompleto, Fornecedor, TipoRefeicao
+
+# Semanas por semestre no calendário sintético (o ano inteiro tem cardápio, como nos restaurantes da UFS)
+SEMANAS_POR_SEMESTRE = 26
+
+_CATEGORIAS = {
+    "prato-principal": ("Prato principal", ("Frango", "Carne", "Peixe", "Feijoada", "Strogonoff", "Almôndega", "Cozido")),
+    "opcao-vegetariana": ("Opção vegetariana", ("Soja", "Grão-de-bico", "Lentilha", "Omelete", "Quibe de abóbora")),
+    "guarnicao": ("Guarnição", ("Farofa", "Purê", "Macarrão", "Batata", "Cuscuz", "Aipim")),
+    "acompanhamento": ("Acompanhamento", ("Arroz", "Feijão", "Arroz integral", "Feijão-verde")),
+    "salada": ("Salada", ("Alface", "Tomate", "Beterraba", "Repolho", "Cenoura", "Pepino")),
+    "sobremesa": ("Sobremesa", ("Banana", "Laranja", "Melancia", "Doce de leite", "Goiabada", "Mamão")),
+    "bebida": ("Bebida", ("Suco de caju", "Suco de acerola", "Suco de goiaba", "Café", "Suco de maracujá")),
+}
+_PREPAROS = ("assado", "cozido", "grelhado", "ao molho", "refogado", "com ervas", "à baiana", "gratinado", "temperado")
+
+# Fornecedor de cada campus, como nas planilhas (ver scraping/planilhas.py)
+FORNECEDORES = {
+    Campus.SAO_CRISTOVAO: Fornecedor.ISM,
+    Campus.LAGARTO: Fornecedor.PRS,
+    Campus.ITABAIANA: Fornecedor.PRS,
+    Campus.SERTAO: Fornecedor.PRS,
+    Campus.CENTRAL: Fornecedor.ISM,
+}
+
+
+@dataclasses.dataclass
+class DadosSinteticos:
+    alimentos: list[Alimento]
+    cardapios: list[Cardapio]
+    inicio: date
+    fim: date
+
+
+def _slug(texto: str) -> str:
+    tabela = str.maketrans("áâãàéêíóôõúç", "aaaaeeiooouc")
+    return "-".join(texto.lower().translate(tabela).split())
+
+
+def gerar_alimentos(quantidade: int, aleatorio: random.Random) -> list[Alimento]:
+    alimentos: dict[str, Alimento] = {}
+    categorias = list(_CATEGORIAS.items())
+    while len(alimentos) < quantidade:
+        categoria_id, (categoria_nome, bases) = categorias[len(alimentos) % len(categorias)]
+        nome = f"{aleatorio.choice(bases)} {aleatorio.choice(_PREPAROS)}"
+        if nome in {alimento.nome for alimento in alimentos.values()}:
+            nome = f"{nome} {len(alimentos)}"
+        id = _slug(nome)
+        alimentos[id] = Alimento(
+            id=id,
+            nome=nome,
+            categoria_id=categoria_id,
+            categoria_nome=categoria_nome,
+            imagem_url=f"https://resun.ufs.br/imagens/{id}.webp" if aleatorio.random() < 0.8 else None,
+        )
+    return list(alimentos.values())
+
+
+def gerar_dados(
+        semestres: int = 4,
+        quantidade_alimentos: int = 400,
+        semente: int = 42,
+        fim: Optional[date] = None
+) -> DadosSinteticos:
+    """
+    Gera cardápios de segunda a sábado (sábado só com almoço) para todos os campi, cobrindo
+    os semestres que terminam na semana seguinte à data fim (por padrão, hoje).
+    """
+    aleatorio = random.Random(semente)
+    alimentos = gerar_alimentos(quantidade_alimentos, aleatorio)
+    por_categoria: dict[str, list[str]] = {}
+    for alimento in alimentos:
+        por_categoria.setdefault(alimento.categoria_id, []).append(alimento.id)
+
+    fim = fim or date.today()
+    fim = fim - timedelta(days=fim.weekday()) + timedelta(days=13)
+    inicio = fim - timedelta(weeks=SEMANAS_POR_SEMESTRE * semestres) + timedelta(days=1)
+
+    cardapios = []
+    dia = inicio
+    while dia <= fim:
+        if dia.weekday() < 6:
+            tipos = (TipoRefeicao.ALMOCO,) if dia.weekday() == 5 else (TipoRefeicao.ALMOCO, TipoRefeicao.JANTAR)
+            for campus in Campus:
+                for tipo in tipos:
+                    id_alimentos = [aleatorio.choice(ids) for ids in por_categoria.values()]
+                    id_alimentos += aleatorio.sample(por_categoria["salada"], 2)
+                    cardapios.append(Cardapio(
+                        campus=campus,
+                        fornecedor=FORNECEDORES[campus],
+                        tipo_refeicao=tipo,
+                        data=dia,
+                        id_alimentos=list(dict.fromkeys(id_alimentos)),
+                    ))
+        dia += timedelta(days=1)
+
+    return DadosSinteticos(alimentos=alimentos, cardapios=cardapios, inicio=inicio, fim=fim)
+
+
+def popular(db, dados: DadosSinteticos, materializar: bool = False):
+    """
+    Grava os dados nas coleções usadas pela API, sem contar leituras nem esperar latência.
+    Com materializar, também grava cardapios_completos e o marcador que habilita a coleção na API.
+    """
+    alimentos = db.collection("alimentos")
+    for alimento in dados.alimentos:
+        alimentos.gravar(alimento.id, alimento.model_dump())
+
+    cardapios = db.collection("cardapios")
+    for cardapio in dados.cardapios:
+        cardapios.gravar(cardapio.id, cardapio.model_dump(mode="json"))
+
+    metadados = db.collection("metadados")
+    metadados.gravar("alimentos", {"versao": "1"})
+    metadados.gravar("cardapios", {"versao": "1"})
+
+    if materializar:
+        alimentos_map = {alimento.id: alimento for alimento in dados.alimentos}
+        cardapios_completos = db.collection("cardapios_completos")
+        for cardapio in dados.cardapios:
+            cardapios_completos.gravar(
+                cardapio.id,
+                CardapioCompleto.a_partir_de(cardapio, alimentos_map).model_dump(mode="json")
+            )
+        metadados.gravar("cardapios_completos", {"completo": True, "versao_alimentos": "1"})
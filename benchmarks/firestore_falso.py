@@ -0,0 +1,265 @@
+"""
+Substituto em memória do firestore.Client para os benchmarks, sem acesso à rede.
+Implementa apenas o que a API e o scraper usam: collection, document().get()/set()/delete(),
+where, order_by, start_after, limit, stream/get, count, get_all, batch e on_snapshot.
+Cada viagem de rede (get, stream, get_all, commit) espera a latência configurada,
+e as leituras de documentos e as chamadas são contadas.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Optional
+
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+from google.cloud.firestore_v1.watch import ChangeType
+
+_OPERADORES: dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda valor, alvo: valor == alvo,
+    "!=": lambda valor, alvo: valor != alvo,
+    "<": lambda valor, alvo: valor is not None and valor < alvo,
+    "<=": lambda valor, alvo: valor is not None and valor <= alvo,
+    ">": lambda valor, alvo: valor is not None and valor > alvo,
+    ">=": lambda valor, alvo: valor is not None and valor >= alvo,
+    "in": lambda valor, alvo: valor in alvo,
+    "not-in": lambda valor, alvo: valor not in alvo,
+    "array_contains": lambda valor, alvo: isinstance(valor, list) and alvo in valor,
+    "array_contains_any": lambda valor, alvo: isinstance(valor, list) and any(item in valor for item in alvo),
+}
+
+
+class SnapshotFalso:
+    def __init__(self, referencia: "ReferenciaFalsa", dados: Optional[dict], update_time: Optional[datetime]):
+        self.reference = referencia
+        self.id = referencia.id
+        self._dados = dados
+        self.exists = dados is not None
+        self.update_time = update_time
+
+    def to_dict(self) -> Optional[dict]:
+        return None if self._dados is None else dict(self._dados)
+
+    def get(self, campo: str) -> Any:
+        return None if self._dados is None else self._dados.get(campo)
+
+
+class ReferenciaFalsa:
+    def __init__(self, colecao: "ColecaoFalsa", id: str):
+        self.colecao = colecao
+        self.id = id
+
+    def _snapshot(self) -> SnapshotFalso:
+        return SnapshotFalso(self, self.colecao.documentos.get(self.id), self.colecao.atualizados_em.get(self.id))
+
+    def get(self) -> SnapshotFalso:
+        self.colecao.db.registrar_chamada(leituras=1)
+        return self._snapshot()
+
+    def set(self, dados: dict, merge: bool = False):
+        self.colecao.db.registrar_chamada()
+        self.colecao.gravar(self.id, dados, merge)
+
+    def delete(self):
+        self.colecao.db.registrar_chamada()
+        self.colecao.apagar(self.id)
+
+
+class ConsultaFalsa:
+    def __init__(self, colecao: "ColecaoFalsa", filtros=(), ordem=(), limite=None, inicio=None):
+        self.colecao = colecao
+        self._filtros = filtros
+        self._ordem = ordem
+        self._limite = limite
+        self._inicio = inicio
+
+    def _copiar(self, **alteracoes) -> "ConsultaFalsa":
+        atributos = {"filtros": self._filtros, "ordem": self._ordem, "limite": self._limite, "inicio": self._inicio}
+        atributos.update(alteracoes)
+        return ConsultaFalsa(self.colecao, **atributos)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copiar(filtros=self._filtros + ((field_path, _OPERADORES[op_string], value),))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING"):
+        return self._copiar(ordem=self._ordem + ((field_path, direction == "DESCENDING"),))
+
+    def limit(self, count: int):
+        return self._copiar(limite=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copiar(inicio=document_fields_or_snapshot)
+
+    def _chave(self, id: str, dados: dict) -> tuple:
+        return tuple(id if campo == "__name__" else dados.get(campo) for campo, _ in self._ordem)
+
+    def _depois_do_inicio(self, id: str, dados: dict) -> bool:
+        """start_after com valores compara só os campos ordenados; com um snapshot, o ID desempata."""
+        direcoes = [decrescente for _, decrescente in self._ordem]
+        if isinstance(self._inicio, SnapshotFalso):
+            chave = self._chave(id, dados) + (id,)
+            chave_inicio = self._chave(self._inicio.id, self._inicio.to_dict() or {}) + (self._inicio.id,)
+            direcoes.append(False)
+        else:
+            chave = self._chave(id, dados)
+            chave_inicio = self._chave(self._inicio.get("__name__", ""), self._inicio)
+        for decrescente, valor, valor_inicio in zip(direcoes, chave, chave_inicio):
+            if valor != valor_inicio:
+                return (valor < valor_inicio) if decrescente else (valor > valor_inicio)
+        return False
+
+    def _executar(self) -> list[tuple[str, dict]]:
+        itens = [
+            (id, dados) for id, dados in self.colecao.documentos.items()
+            if all(operador(dados.get(campo), alvo) for campo, operador, alvo in self._filtros)
+        ]
+        # Ordenações estáveis aplicadas do último campo para o primeiro, com o ID como desempate
+        itens.sort(key=lambda item: item[0])
+        for campo, decrescente in reversed(self._ordem):
+            itens.sort(key=lambda item: item[0] if campo == "__name__" else item[1].get(campo), reverse=decrescente)
+
+        if self._inicio is not None:
+            itens = [(id, dados) for id, dados in itens if self._depois_do_inicio(id, dados)]
+        if self._limite is not None:
+            itens = itens[:self._limite]
+        return itens
+
+    def stream(self, transaction=None) -> Iterable[SnapshotFalso]:
+        itens = self._executar()
+        self.colecao.db.registrar_chamada(leituras=len(itens))
+        for id, _ in itens:
+            yield ReferenciaFalsa(self.colecao, id)._snapshot()
+
+    def get(self, transaction=None) -> list[SnapshotFalso]:
+        return list(self.stream())
+
+    def count(self, alias: Optional[str] = None) -> "ContagemFalsa":
+        return ContagemFalsa(self, alias or "count")
+
+
+class ContagemFalsa:
+    def __init__(self, consulta: ConsultaFalsa, alias: str):
+        self.consulta = consulta
+        self.alias = alias
+
+    def get(self, transaction=None) -> list[list[AggregationResult]]:
+        quantidade = len(self.consulta._executar())
+        # O Firestore cobra uma leitura a cada mil documentos contados
+        self.consulta.colecao.db.registrar_chamada(leituras=max(1, -(-quantidade // 1000)))
+        return [[AggregationResult(self.alias, quantidade)]]
+
+
+class _Mudanca:
+    def __init__(self, tipo: ChangeType, documento: SnapshotFalso):
+        self.type = tipo
+        self.document = documento
+
+
+class _Assinatura:
+    def __init__(self, colecao: "ColecaoFalsa", callback):
+        self._colecao = colecao
+        self._callback = callback
+
+    def unsubscribe(self):
+        if self._callback in self._colecao.ouvintes:
+            self._colecao.ouvintes.remove(self._callback)
+
+
+class ColecaoFalsa(ConsultaFalsa):
+    def __init__(self, db: "FirestoreFalso", nome: str):
+        super().__init__(self)
+        self.db = db
+        self.nome = nome
+        self.documentos: dict[str, dict] = {}
+        self.atualizados_em: dict[str, datetime] = {}
+        self.ouvintes: list[Callable] = []
+
+    def document(self, document_id: str) -> ReferenciaFalsa:
+        return ReferenciaFalsa(self, document_id)
+
+    def gravar(self, id: str, dados: dict, merge: bool = False):
+        tipo = ChangeType.MODIFIED if id in self.documentos else ChangeType.ADDED
+        if merge and id in self.documentos:
+            dados = {**self.documentos[id], **dados}
+        self.documentos[id] = dict(dados)
+        self.atualizados_em[id] = datetime.now(timezone.utc)
+        self._notificar([_Mudanca(tipo, ReferenciaFalsa(self, id)._snapshot())])
+
+    def apagar(self, id: str):
+        if self.documentos.pop(id, None) is not None:
+            self.atualizados_em.pop(id, None)
+            self._notificar([_Mudanca(ChangeType.REMOVED, SnapshotFalso(ReferenciaFalsa(self, id), None, None))])
+
+    def on_snapshot(self, callback) -> _Assinatura:
+        """Entrega imediatamente todos os documentos como ADDED e, depois, cada gravação na coleção."""
+        mudancas = [_Mudanca(ChangeType.ADDED, ReferenciaFalsa(self, id)._snapshot()) for id in sorted(self.documentos)]
+        self.db.registrar_chamada(leituras=len(mudancas))
+        callback([mudanca.document for mudanca in mudancas], mudancas, datetime.now(timezone.utc))
+        self.ouvintes.append(callback)
+        return _Assinatura(self, callback)
+
+    def _notificar(self, mudancas: list[_Mudanca]):
+        for callback in list(self.ouvintes):
+            callback([], mudancas, datetime.now(timezone.utc))
+
+
+class LoteFalso:
+    def __init__(self, db: "FirestoreFalso"):
+        self.db = db
+        self._operacoes: list[Callable[[], None]] = []
+
+    def set(self, referencia: ReferenciaFalsa, dados: dict, merge: bool = False):
+        self._operacoes.append(lambda: referencia.colecao.gravar(referencia.id, dados, merge))
+
+    def delete(self, referencia: ReferenciaFalsa):
+        self._operacoes.append(lambda: referencia.colecao.apagar(referencia.id))
+
+    def commit(self):
+        self.db.registrar_chamada()
+        for operacao in self._operacoes:
+            operacao()
+        self._operacoes = []
+
+
+class FirestoreFalso:
+    """
+    latencia_ms é esperada em cada viagem de rede, com uma variação uniforme de até variacao_ms
+    para mais ou para menos. As chamadas vêm das threads de dados.py, então os contadores usam um lock.
+    """
+
+    def __init__(self, latencia_ms: float = 0.0, variacao_ms: float = 0.0, semente: Optional[int] = None):
+        self.latencia_ms = latencia_ms
+        self.variacao_ms = variacao_ms
+        self._colecoes: dict[str, ColecaoFalsa] = {}
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self.leituras = 0
+        self.chamadas = 0
+
+    def collection(self, collection_path: str) -> ColecaoFalsa:
+        if collection_path not in self._colecoes:
+            self._colecoes[collection_path] = ColecaoFalsa(self, collection_path)
+        return self._colecoes[collection_path]
+
+    def get_all(self, references: Iterable[ReferenciaFalsa], field_paths=None, transaction=None) -> Iterable[SnapshotFalso]:
+        referencias = list(references)
+        self.registrar_chamada(leituras=len(referencias))
+        for referencia in referencias:
+            yield referencia._snapshot()
+
+    def batch(self) -> LoteFalso:
+        return LoteFalso(self)
+
+    def registrar_chamada(self, leituras: int = 0):
+        with self._lock:
+            self.chamadas += 1
+            self.leituras += leituras
+            espera = self.latencia_ms + self._aleatorio.uniform(-self.variacao_ms, self.variacao_ms)
+        if espera > 0:
+            time.sleep(espera / 1000)
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.leituras = 0
+            self.chamadas = 0
@@ -0,0 +1,235 @@
+"""
+Benchmark e conferência do parser das planilhas (scraping/planilhas.py) sem o Google Sheets.
+
+Etapas:
+  gravadas  extrair_cardapios de cada campus e obter_todos_cardapios_dessa_semana de ponta a ponta,
+            sobre as planilhas gravadas em benchmarks/fixtures/planilhas/ (ou, sem elas, sobre
+            uma planilha sintética por campus)
+  escala    extrair_todos_cardapios sobre --campi × --semanas planilhas sintéticas, e o parser
+            sozinho (normalização dos textos e consulta aos mapeamentos) sobre as mesmas grades
+
+Os cardápios extraídos são conferidos com os gravados, e qualquer divergência é listada.
+Com --perfil, a etapa de escala roda sob o cProfile e as funções mais custosas são exibidas.
+
+Uso:
+    python -m benchmarks.planilhas --capturar           # grava as planilhas atuais (requer credenciais)
+    python -m benchmarks.planilhas --campi 100 --semanas 52 --perfil
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.planilhas_gravadas import (
+    DIRETORIO_FIXTURES,
+    ClienteGravado,
+    PlanilhaGravada,
+    WorksheetGravada,
+    capturar,
+    carregar_fixtures,
+    gerar_planilhas_sinteticas,
+    resumir_extracao,
+    substituir_ids,
+)
+from benchmarks.registro import gravar_resultados
+from scraping.planilhas import (
+    TODOS_CARDAPIOS_SEMANAIS_PLANILHAS,
+    CardapioSemanalPlanilha,
+    GradePlanilha,
+    extrair_todos_cardapios,
+    obter_todos_cardapios_dessa_semana,
+)
+
+
+def _cronometrar(funcao: Callable[[], object], repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "repeticoes": repeticoes,
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "p50_ms": round(statistics.median(tempos), 3),
+        "max_ms": round(max(tempos), 3),
+    }
+
+
+def conferir(planilhas: list[CardapioSemanalPlanilha], gravadas: list[PlanilhaGravada]) -> list[str]:
+    """Compara o que o parser extrai de cada planilha gravada com os cardápios gravados junto dela."""
+    por_id = {gravada.id_planilha: gravada for gravada in gravadas}
+    divergencias = []
+    for planilha in planilhas:
+        gravada = por_id[planilha.id_planilha]
+        grade = GradePlanilha.carregar(WorksheetGravada(gravada.valores), planilha.posicoes_lidas())
+        extraido = resumir_extracao(planilha, grade)
+        if extraido != gravada.esperado:
+            divergencias.append(f"{planilha.campus.value} ({planilha.id_planilha}): {extraido} != {gravada.esperado}")
+    return divergencias
+
+
+def medir_gravadas(gravadas: list[PlanilhaGravada], argumentos: argparse.Namespace) -> dict:
+    planilhas = substituir_ids(TODOS_CARDAPIOS_SEMANAIS_PLANILHAS, gravadas)
+    client = ClienteGravado({gravada.id_planilha: gravada.valores for gravada in gravadas}, argumentos.latencia_ms)
+
+    resultado = {"extrair_cardapios": {}}
+    for planilha in planilhas:
+        resultado["extrair_cardapios"][planilha.campus.value] = _cronometrar(
+            lambda: planilha.extrair_cardapios(client), argumentos.repeticoes
+        )
+    resultado["obter_todos_cardapios_dessa_semana"] = _cronometrar(
+        lambda: obter_todos_cardapios_dessa_semana(argumentos.max_workers, client=client, planilhas=planilhas),
+        argumentos.repeticoes
+    )
+    resultado["divergencias"] = conferir(planilhas, gravadas)
+    return resultado
+
+
+def medir_escala(argumentos: argparse.Namespace) -> dict:
+    planilhas, gravadas = gerar_planilhas_sinteticas(argumentos.campi, argumentos.semanas, argumentos.semente)
+    client = ClienteGravado({gravada.id_planilha: gravada.valores for gravada in gravadas}, argumentos.latencia_ms)
+    celulas = sum(len(planilha.posicoes_referenciadas()) for planilha in planilhas)
+
+    # Leitura das grades fora da medição do parser, para isolar a normalização e as consultas aos mapeamentos
+    grades = [
+        GradePlanilha.carregar(WorksheetGravada(gravada.valores), planilha.posicoes_lidas())
+        for planilha, gravada in zip(planilhas, gravadas)
+    ]
+
+    def extrair_das_grades():
+        for planilha, grade in zip(planilhas, grades):
+            planilha.extrair_cardapios_da_grade(grade)
+
+    def extrair_de_ponta_a_ponta():
+        with redirect_stdout(StringIO()):
+            resultado = extrair_todos_cardapios(argumentos.max_workers, client=client, planilhas=planilhas)
+        if resultado.falhas:
+            raise RuntimeError(f"{len(resultado.falhas)} planilhas falharam: {resultado.falhas}")
+
+    perfil = cProfile.Profile() if argumentos.perfil else None
+    if perfil:
+        perfil.enable()
+    parser = _cronometrar(extrair_das_grades, 1)
+    ponta_a_ponta = _cronometrar(extrair_de_ponta_a_ponta, 1)
+    if perfil:
+        perfil.disable()
+        estatisticas = pstats.Stats(perfil).sort_stats("tottime")
+        estatisticas.print_stats(argumentos.perfil_linhas)
+        if argumentos.perfil_arquivo:
+            estatisticas.dump_stats(argumentos.perfil_arquivo)
+
+    return {
+        "planilhas": len(planilhas),
+        "celulas": celulas,
+        "parser_ms": parser["media_ms"],
+        "parser_ms_por_planilha": round(parser["media_ms"] / len(planilhas), 4),
+        "parser_celulas_por_segundo": round(celulas / (parser["media_ms"] / 1000)),
+        "ponta_a_ponta_ms": ponta_a_ponta["media_ms"],
+        "divergencias": conferir(planilhas, gravadas),
+    }
+
+
+def comparar(atual: dict, anterior: dict, tolerancia: float) -> list[str]:
+    regressoes = []
+    medidas = [
+        ("escala/parser_ms", atual["escala"]["parser_ms"], anterior.get("escala", {}).get("parser_ms")),
+        ("escala/ponta_a_ponta_ms", atual["escala"]["ponta_a_ponta_ms"], anterior.get("escala", {}).get("ponta_a_ponta_ms")),
+        (
+            "gravadas/obter_todos_cardapios_dessa_semana",
+            atual["gravadas"]["obter_todos_cardapios_dessa_semana"]["p50_ms"],
+            anterior.get("gravadas", {}).get("obter_todos_cardapios_dessa_semana", {}).get("p50_ms"),
+        ),
+    ]
+    for campus, medida in atual["gravadas"]["extrair_cardapios"].items():
+        base = anterior.get("gravadas", {}).get("extrair_cardapios", {}).get(campus, {})
+        medidas.append((f"gravadas/extrair_cardapios/{campus}", medida["p50_ms"], base.get("p50_ms")))
+
+    for nome, valor, base in medidas:
+        if base is not None and valor > base * (1 + tolerancia):
+            regressoes.append(f"{nome}: {base:.3f} -> {valor:.3f} ms")
+    return regressoes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do parser das planilhas com planilhas gravadas.")
+    parser.add_argument("--capturar", action="store_true", help="Grava as planilhas atuais e encerra.")
+    parser.add_argument("--fixtures", type=Path, default=DIRETORIO_FIXTURES)
+    parser.add_argument("--campi", type=int, default=100, help="Campi sintéticos na etapa de escala.")
+    parser.add_argument("--semanas", type=int, default=52, help="Semanas por campus sintético.")
+    parser.add_argument("--repeticoes", type=int, default=50, help="Repetições da etapa com as planilhas gravadas.")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência simulada de cada chamada ao Sheets.")
+    parser.add_argument("--max-workers", type=int, default=8, help="Threads de extrair_todos_cardapios.")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--perfil", action="store_true", help="Executa a etapa de escala sob o cProfile.")
+    parser.add_argument("--perfil-linhas", type=int, default=25)
+    parser.add_argument("--perfil-arquivo", type=Path, help="Grava as estatísticas do cProfile (pstats).")
+    parser.add_argument("--saida", type=Path)
+    parser.add_argument("--comparar", type=Path)
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    argumentos = parser.parse_args()
+
+    if argumentos.capturar:
+        from auth import get_gspread_client_service_account
+        for caminho in capturar(get_gspread_client_service_account(), argumentos.fixtures):
+            print(f"Planilha gravada em {caminho}")
+        return 0
+
+    gravadas = carregar_fixtures(argumentos.fixtures)
+    origem = "gravadas"
+    if not gravadas:
+        _, gravadas = gerar_planilhas_sinteticas(len(TODOS_CARDAPIOS_SEMANAIS_PLANILHAS), 1, argumentos.semente)
+        origem = "sinteticas"
+        print(f"Nenhuma planilha gravada em {argumentos.fixtures}; usando uma planilha sintética por campus.")
+
+    resultado_gravadas = medir_gravadas(gravadas, argumentos)
+    resultado_gravadas["origem"] = origem
+    for campus, medida in resultado_gravadas["extrair_cardapios"].items():
+        print(f"extrair_cardapios {campus:<15} p50 {medida['p50_ms']:.3f} ms")
+    medida = resultado_gravadas["obter_todos_cardapios_dessa_semana"]
+    print(f"obter_todos_cardapios_dessa_semana p50 {medida['p50_ms']:.3f} ms")
+
+    resultado_escala = medir_escala(argumentos)
+    print(
+        f"escala: {resultado_escala['planilhas']} planilhas, {resultado_escala['celulas']} células; "
+        f"parser {resultado_escala['parser_ms']:.1f} ms ({resultado_escala['parser_celulas_por_segundo']} células/s), "
+        f"ponta a ponta {resultado_escala['ponta_a_ponta_ms']:.1f} ms"
+    )
+
+    divergencias = resultado_gravadas["divergencias"] + resultado_escala["divergencias"]
+    for divergencia in divergencias:
+        print(f"Divergência: {divergencia}")
+
+    execucao, saida = gravar_resultados(
+        "planilhas",
+        {
+            "campi": argumentos.campi,
+            "semanas": argumentos.semanas,
+            "repeticoes": argumentos.repeticoes,
+            "latencia_ms": argumentos.latencia_ms,
+            "max_workers": argumentos.max_workers,
+            "semente": argumentos.semente,
+        },
+        {"gravadas": resultado_gravadas, "escala": resultado_escala},
+        argumentos.saida
+    )
+    print(f"Resultados gravados em {saida}")
+
+    codigo = 1 if divergencias else 0
+    if argumentos.comparar:
+        regressoes = comparar(execucao, json.loads(argumentos.comparar.read_text(encoding="utf-8")), argumentos.tolerancia)
+        for regressao in regressoes:
+            print(f"Regressão: {regressao}")
+        if regressoes:
+            codigo = 1
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
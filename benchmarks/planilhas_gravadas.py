@@ -0,0 +1,235 @@
+"""
+Planilhas gravadas para rodar scraping/planilhas.py sem o Google Sheets.
+
+A captura salva a grade completa de valores da planilha de cada campus (get_all_values) em um
+arquivo JSON, junto com os cardápios que o parser extraiu dela naquele momento. Na reprodução,
+ClienteGravado e WorksheetGravada atendem open_by_key(...).sheet1 e batch_get a partir desses
+arquivos, e os cardápios extraídos podem ser conferidos com os gravados.
+Também são geradas planilhas sintéticas, a partir das posições e mapeamentos de cada campus,
+para medir o parser em escala (por exemplo, 100 campi × 52 semanas).
+"""
+import dataclasses
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from gspread.utils import a1_range_to_grid_range
+
+from modelos import TipoRefeicao
+from scraping.planilhas import TODOS_CARDAPIOS_SEMANAIS_PLANILHAS, CardapioSemanalPlanilha, DiaSemana, GradePlanilha
+
+DIRETORIO_FIXTURES = Path(__file__).parent / "fixtures" / "planilhas"
+
+NOMES_DIAS = {
+    DiaSemana.SEGUNDA: "SEGUNDA", DiaSemana.TERCA: "TERÇA", DiaSemana.QUARTA: "QUARTA",
+    DiaSemana.QUINTA: "QUINTA", DiaSemana.SEXTA: "SEXTA",
+}
+NOMES_REFEICOES = {TipoRefeicao.ALMOCO: "ALMOÇO", TipoRefeicao.JANTAR: "JANTAR"}
+
+
+@dataclasses.dataclass
+class PlanilhaGravada:
+    campus: str
+    id_planilha: str
+    # Grade de valores como retornada por Worksheet.get_all_values (linhas de textos)
+    valores: list[list[str]]
+    # Cardápios extraídos na captura: {"dia_semana", "tipo_refeicao", "id_alimentos"} ou {"erro"}
+    esperado: list[dict]
+    capturado_em: str = ""
+
+    def salvar(self, diretorio: Path = DIRETORIO_FIXTURES) -> Path:
+        diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = diretorio / f"{self.campus}.json"
+        caminho.write_text(json.dumps(dataclasses.asdict(self), ensure_ascii=False, indent=1), encoding="utf-8")
+        return caminho
+
+    @classmethod
+    def carregar(cls, caminho: Path) -> "PlanilhaGravada":
+        return cls(**json.loads(caminho.read_text(encoding="utf-8")))
+
+
+class WorksheetGravada:
+    """Substitui gspread.Worksheet nas chamadas feitas pelo parser, esperando latencia_ms em cada uma."""
+
+    def __init__(self, valores: list[list[str]], latencia_ms: float = 0.0):
+        self.valores = valores
+        self.latencia_ms = latencia_ms
+        self.chamadas = 0
+
+    def _esperar(self):
+        self.chamadas += 1
+        if self.latencia_ms > 0:
+            time.sleep(self.latencia_ms / 1000)
+
+    def _faixa(self, faixa_a1: str) -> list[list[str]]:
+        # Como na API do Sheets, células vazias no fim das linhas e linhas vazias no fim da faixa são omitidas
+        faixa = a1_range_to_grid_range(faixa_a1)
+        linhas = []
+        for linha in self.valores[faixa.get("startRowIndex", 0):faixa.get("endRowIndex", len(self.valores))]:
+            celulas = linha[faixa.get("startColumnIndex", 0):faixa.get("endColumnIndex", len(linha))]
+            while celulas and celulas[-1] == "":
+                celulas.pop()
+            linhas.append(celulas)
+        while linhas and not linhas[-1]:
+            linhas.pop()
+        return linhas
+
+    def batch_get(self, ranges: list[str], **kwargs) -> list[list[list[str]]]:
+        self._esperar()
+        return [self._faixa(faixa) for faixa in ranges]
+
+    def get(self, range_name: str | None = None, **kwargs) -> list[list[str]]:
+        self._esperar()
+        return self._faixa(range_name) if range_name else [list(linha) for linha in self.valores]
+
+    def get_all_values(self, **kwargs) -> list[list[str]]:
+        self._esperar()
+        return [list(linha) for linha in self.valores]
+
+
+class _PlanilhaAberta:
+    def __init__(self, sheet1: WorksheetGravada):
+        self.sheet1 = sheet1
+
+
+class ClienteGravado:
+    """Substitui gspread.Client: open_by_key devolve a planilha gravada com o ID informado."""
+
+    def __init__(self, planilhas: dict[str, list[list[str]]], latencia_ms: float = 0.0):
+        self.planilhas = planilhas
+        self.latencia_ms = latencia_ms
+        self._lock = threading.Lock()
+        self.chamadas = 0
+
+    def open_by_key(self, key: str) -> _PlanilhaAberta:
+        with self._lock:
+            self.chamadas += 1
+        if key not in self.planilhas:
+            raise KeyError(f"Planilha '{key}' não gravada")
+        return _PlanilhaAberta(WorksheetGravada(self.planilhas[key], self.latencia_ms))
+
+
+def resumir_extracao(planilha: CardapioSemanalPlanilha, grade: GradePlanilha) -> list[dict]:
+    """Cardápios extraídos da grade, sem as datas (que dependem da semana em que o parser roda)."""
+    try:
+        cardapios = planilha.extrair_cardapios_da_grade(grade)
+    except Exception as e:
+        return [{"erro": str(e)}]
+    return [
+        {
+            "dia_semana": cardapio_diario.dia_semana.value,
+            "tipo_refeicao": cardapio.tipo_refeicao.value,
+            "id_alimentos": cardapio.id_alimentos,
+        }
+        for cardapio_diario, cardapio in zip(planilha.cardapios_diarios, cardapios)
+    ]
+
+
+def capturar(client, diretorio: Path = DIRETORIO_FIXTURES) -> list[Path]:
+    """Grava a planilha de cada campus usando o gspread.Client real."""
+    caminhos = []
+    for planilha in TODOS_CARDAPIOS_SEMANAIS_PLANILHAS:
+        valores = planilha.obter_sheet(client).get_all_values()
+        grade = GradePlanilha.carregar(WorksheetGravada(valores), planilha.posicoes_lidas())
+        gravada = PlanilhaGravada(
+            campus=planilha.campus.value,
+            # Os IDs vêm do ambiente e podem faltar; na reprodução, o ID gravado só precisa ser único
+            id_planilha=planilha.id_planilha or f"gravada-{planilha.campus.value}",
+            valores=valores,
+            esperado=resumir_extracao(planilha, grade),
+            capturado_em=datetime.now().isoformat(timespec="seconds"),
+        )
+        caminhos.append(gravada.salvar(diretorio))
+    return caminhos
+
+
+def carregar_fixtures(diretorio: Path = DIRETORIO_FIXTURES) -> list[PlanilhaGravada]:
+    return [PlanilhaGravada.carregar(caminho) for caminho in sorted(diretorio.glob("*.json"))]
+
+
+def _ruido(texto: str, aleatorio: random.Random) -> str:
+    """Variações de espaços e quebras de linha que o parser normaliza, como nas planilhas reais."""
+    variacao = aleatorio.random()
+    if variacao < 0.5:
+        return texto
+    if variacao < 0.7:
+        return f" {texto}  "
+    if variacao < 0.9:
+        return texto.replace(" ", "\n", 1)
+    return texto.replace(" ", "  ")
+
+
+def gerar_planilha_sintetica(
+        planilha: CardapioSemanalPlanilha,
+        id_planilha: str,
+        aleatorio: random.Random,
+        proporcao_vazias: float = 0.15
+) -> PlanilhaGravada:
+    """
+    Preenche as posições da configuração do campus com textos do seu mapeamento, em ordem aleatória.
+    Os cardápios esperados vêm dos textos sorteados, e não do parser, para que sirvam de conferência.
+    Na primeira linha de cada bloco vão os marcadores, como nas planilhas reais: o dia na coluna A
+    (só no primeiro bloco do dia) e a refeição na coluna anterior à dos alimentos.
+    """
+    posicoes = planilha.posicoes_referenciadas()
+    linhas = max(row for row, _ in posicoes)
+    colunas = max(col for _, col in posicoes) + 1
+    valores = [[""] * colunas for _ in range(linhas)]
+    textos = list(planilha.id_alimentos_mapa)
+
+    esperado = []
+    dias_marcados = set()
+    for cardapio_diario in planilha.cardapios_diarios:
+        primeira_linha = min(row for row, _ in cardapio_diario.posicao_alimentos)
+        if cardapio_diario.dia_semana not in dias_marcados:
+            dias_marcados.add(cardapio_diario.dia_semana)
+            valores[primeira_linha - 1][0] = f"{NOMES_DIAS[cardapio_diario.dia_semana]}-FEIRA"
+        valores[primeira_linha - 1][planilha.coluna_itens - 2] = NOMES_REFEICOES[cardapio_diario.tipo_refeicao]
+
+        id_alimentos = []
+        for row, col in cardapio_diario.posicao_alimentos:
+            if aleatorio.random() < proporcao_vazias:
+                continue
+            texto = aleatorio.choice(textos)
+            valores[row - 1][col - 1] = _ruido(texto, aleatorio)
+            id_alimentos.append(planilha.id_alimentos_mapa[texto])
+        esperado.append({
+            "dia_semana": cardapio_diario.dia_semana.value,
+            "tipo_refeicao": cardapio_diario.tipo_refeicao.value,
+            "id_alimentos": id_alimentos,
+        })
+
+    return PlanilhaGravada(campus=planilha.campus.value, id_planilha=id_planilha, valores=valores, esperado=esperado)
+
+
+def gerar_planilhas_sinteticas(
+        quantidade_campi: int,
+        semanas: int,
+        semente: int = 42
+) -> tuple[list[CardapioSemanalPlanilha], list[PlanilhaGravada]]:
+    """
+    Cria quantidade_campi × semanas planilhas, cada campus sintético reaproveitando a configuração
+    de um dos campi reais (em rodízio) com um ID de planilha próprio por semana.
+    """
+    aleatorio = random.Random(semente)
+    configuracoes, gravadas = [], []
+    for indice_campus in range(quantidade_campi):
+        base = TODOS_CARDAPIOS_SEMANAIS_PLANILHAS[indice_campus % len(TODOS_CARDAPIOS_SEMANAIS_PLANILHAS)]
+        for semana in range(semanas):
+            id_planilha = f"sintetica-{indice_campus:03d}-{semana:02d}"
+            configuracoes.append(dataclasses.replace(base, id_planilha=id_planilha))
+            gravadas.append(gerar_planilha_sintetica(base, id_planilha, aleatorio))
+    return configuracoes, gravadas
+
+
+def substituir_ids(planilhas: list[CardapioSemanalPlanilha], gravadas: list[PlanilhaGravada]) -> list[CardapioSemanalPlanilha]:
+    """Associa as configurações dos campi às planilhas gravadas do mesmo campus, usando os IDs gravados."""
+    por_campus = {gravada.campus: gravada for gravada in gravadas}
+    return [
+        dataclasses.replace(planilha, id_planilha=por_campus[planilha.campus.value].id_planilha)
+        for planilha in planilhas
+        if planilha.campus.value in por_campus
+    ]
@@ -0,0 +1,33 @@
+"""Gravação dos resultados dos benchmarks, para comparar execuções entre versões"""
+import json
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+DIRETORIO_RESULTADOS = Path(__file__).parent / "resultados"
+
+
+def commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def gravar_resultados(prefixo: str, configuracao: dict, resultados: dict, saida: Optional[Path] = None) -> tuple[dict, Path]:
+    """Grava a execução em JSON (por padrão em benchmarks/resultados/<prefixo>-<data>.json) e a retorna."""
+    execucao = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "configuracao": configuracao,
+        **resultados,
+    }
+    saida = saida or DIRETORIO_RESULTADOS / f"{prefixo}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(execucao, ensure_ascii=False, indent=2), encoding="utf-8")
+    return execucao, saida
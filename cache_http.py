@@ -0,0 +1,108 @@
+"""Respostas condicionais (ETag / Last-Modified) e cabeçalhos Cache-Control para as rotas de leitura"""
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Union
+
+from fastapi import Request, Response
+
+from compressao import TAMANHO_MINIMO, ConteudoComprimido, escolher_codificacao
+
+# Sergipe não adota horário de verão
+FUSO_HORARIO_UFS = timezone(timedelta(hours=-3))
+
+# Cardápios de dias que já passaram praticamente não mudam; os de hoje e dos próximos dias ainda podem ser corrigidos
+CACHE_CONTROL_PASSADO = "public, max-age=86400"
+CACHE_CONTROL_ATUAL = "public, max-age=300, stale-while-revalidate=60"
+CACHE_CONTROL_CATALOGO = "public, max-age=3600, stale-while-revalidate=300"
+CACHE_CONTROL_ESTATICO = "public, max-age=86400"
+
+
+def hoje_na_ufs() -> date:
+    return datetime.now(FUSO_HORARIO_UFS).date()
+
+
+def cache_control_para_datas(datas: Iterable[date]) -> str:
+    """Usa o cache longo apenas quando todas as datas da resposta já passaram."""
+    hoje = hoje_na_ufs()
+    datas = list(datas)
+    if datas and all(data < hoje for data in datas):
+        return CACHE_CONTROL_PASSADO
+    return CACHE_CONTROL_ATUAL
+
+
+def calcular_etag(conteudo: bytes) -> str:
+    return f'"{hashlib.sha256(conteudo).hexdigest()[:32]}"'
+
+
+def _etag_corresponde(if_none_match: str, etag: str) -> bool:
+    # Para GET a comparação é fraca: o prefixo W/ é ignorado (RFC 9110, seção 13.1.2)
+    candidatos = [candidato.strip() for candidato in if_none_match.split(",")]
+    return any(candidato == "*" or candidato.removeprefix("W/") == etag for candidato in candidatos)
+
+
+def _nao_modificado_desde(if_modified_since: str, ultima_modificacao: datetime) -> bool:
+    try:
+        limite = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if limite.tzinfo is None:
+        limite = limite.replace(tzinfo=timezone.utc)
+    return ultima_modificacao.replace(microsecond=0) <= limite
+
+
+def resposta_condicional(
+        request: Request,
+        conteudo: Union[bytes, ConteudoComprimido],
+        cache_control: str,
+        ultima_modificacao: Optional[datetime] = None,
+        media_type: str = "application/json",
+        etag: Optional[str] = None
+) -> Response:
+    """
+    Monta a resposta com ETag, Last-Modified e Cache-Control, respondendo 304 quando
+    o cliente já possui a mesma versão (If-None-Match tem precedência sobre If-Modified-Since).
+    Conteúdos guardados em cache podem informar o ETag já calculado e, como ConteudoComprimido,
+    são enviados na variante pré-comprimida aceita pelo cliente; os demais são comprimidos pelo CompressaoMiddleware.
+    """
+    comprimido = conteudo if isinstance(conteudo, ConteudoComprimido) else None
+    if comprimido is not None:
+        conteudo = comprimido.conteudo
+    if etag is None:
+        etag = calcular_etag(conteudo)
+
+    codificacao = None
+    if len(conteudo) >= TAMANHO_MINIMO:
+        codificacao = escolher_codificacao(request.headers.get("accept-encoding"))
+
+    # O corpo enviado varia com a codificação, então o ETag deixa de ser forte (como faz o nginx)
+    headers = {"ETag": f"W/{etag}" if codificacao else etag, "Cache-Control": cache_control}
+    if ultima_modificacao is not None:
+        headers["Last-Modified"] = format_datetime(ultima_modificacao.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_none_match is not None:
+        nao_modificado = _etag_corresponde(if_none_match, etag)
+    else:
+        nao_modificado = (
+            if_modified_since is not None
+            and ultima_modificacao is not None
+            and _nao_modificado_desde(if_modified_since, ultima_modificacao)
+        )
+
+    # Toda resposta cujo corpo pode variar com a codificação informa isso, inclusive a enviada sem
+    # compressão e a 304, para que um cache compartilhado não entregue a um cliente a variante de outro.
+    # Com variantes pré-comprimidas a negociação é feita aqui (e o CompressaoMiddleware deixa a resposta
+    # passar); nas demais, o middleware comprime as respostas a partir do tamanho mínimo e acrescenta o Vary
+    if comprimido is not None or (nao_modificado and len(conteudo) >= TAMANHO_MINIMO):
+        headers["Vary"] = "Accept-Encoding"
+
+    if nao_modificado:
+        return Response(status_code=304, headers=headers)
+
+    if comprimido is not None and codificacao:
+        headers["Content-Encoding"] = codificacao
+        conteudo = comprimido.variante(codificacao)
+    return Response(content=conteudo, media_type=media_type, headers=headers)
@@ -0,0 +1,272 @@
+"""Cache em memória do catálogo de alimentos"""
+import asyncio
+import dataclasses
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from google.cloud import firestore
+
+from cache_http import calcular_etag
+from compressao import ConteudoComprimido
+from dados import DOCUMENTO_VERSAO_ALIMENTOS, consultar, ler_versao, obter_documentos
+from serializacao import serializar_alimento, serializar_lista
+from snapshot import SnapshotCardapios
+
+# Páginas da listagem guardadas prontas para envio (combinações de cursor e limite)
+MAXIMO_PAGINAS = 32
+
+
+async def buscar_alimentos_por_ids(db: firestore.Client, ids: Iterable[str]) -> dict[str, bytes]:
+    """
+    Busca no Firestore, sem repetições e em lotes concorrentes, os alimentos de todos os IDs informados,
+    retornando o JSON de cada um.
+    """
+    ids_unicos = list(dict.fromkeys(ids))
+    refs = [db.collection("alimentos").document(id) for id in ids_unicos]
+
+    alimentos_map = {}
+    for doc in await obter_documentos(db, refs):
+        if doc.exists:
+            dados = doc.to_dict()
+            alimentos_map[dados["id"]] = serializar_alimento(dados)
+
+    return alimentos_map
+
+
+@dataclasses.dataclass
+class PaginaAlimentos:
+    conteudo: ConteudoComprimido
+    etag: str
+    # ID do último alimento, quando a página veio cheia
+    ultimo_id: Optional[str]
+
+
+class CatalogoAlimentos:
+    """
+    Mantém a coleção de alimentos em memória, limitada por tamanho e por TTL.
+    A carga completa é feita no lifespan e renovada em segundo plano quando o TTL expira
+    ou quando o documento de versão (metadados/alimentos) muda. Como a versão é publicada pelo
+    scraper, uma inclusão ou remoção de alimento aparece após a próxima execução dele (de hora em
+    hora) e uma edição, após o TTL ou a verificação completa diária do scraper, o que vier antes;
+    sem esperar, basta executar o scraper com --forcar.
+
+    IDs ausentes de um cache incompleto são buscados no Firestore e guardados enquanto houver espaço;
+    com o catálogo completo, são tratados como inexistentes (por exemplo, um alimento removido).
+
+    Cada alimento é guardado já serializado em JSON, pronto para ser embutido nas respostas,
+    e as páginas da listagem ficam guardadas com as variantes comprimidas até a próxima alteração.
+
+    Com snapshot (modo snapshot da API), os alimentos vêm do arquivo, o TTL não vale e IDs ausentes
+    dele são tratados como inexistentes, sem consultas ao Firestore.
+    """
+
+    def __init__(
+            self,
+            db: Optional[firestore.Client],
+            ttl_segundos: Optional[float] = None,
+            tamanho_maximo: Optional[int] = None,
+            intervalo_atualizacao: Optional[float] = None,
+            snapshot: Optional[SnapshotCardapios] = None,
+    ):
+        self.db = db
+        self.snapshot = snapshot
+        # Lidos ao criar o catálogo, e não ao importar o módulo, para valer o ambiente do momento
+        if ttl_segundos is None:
+            ttl_segundos = float(os.getenv("CATALOGO_TTL_SEGUNDOS", 3600))
+        if tamanho_maximo is None:
+            tamanho_maximo = int(os.getenv("CATALOGO_TAMANHO_MAXIMO", 5000))
+        if intervalo_atualizacao is None:
+            intervalo_atualizacao = float(os.getenv("CATALOGO_INTERVALO_ATUALIZACAO", 60))
+        self.ttl_segundos = ttl_segundos
+        self.tamanho_maximo = tamanho_maximo
+        self.intervalo_atualizacao = intervalo_atualizacao
+
+        self._alimentos: OrderedDict[str, bytes] = OrderedDict()
+        self._paginas: OrderedDict[tuple[Optional[str], int], PaginaAlimentos] = OrderedDict()
+        # Incrementada a cada alteração, para descartar páginas montadas com dados antigos
+        self._geracao = 0
+        self._carregado_em: Optional[float] = None
+        self._completo = False
+        # Quando um listener do Firestore mantém o catálogo (ver indice.py), o TTL deixa de valer
+        self.sincronizado_por_listener = False
+        self.versao: Optional[str] = None
+        # Maior update_time entre os documentos carregados, usado como Last-Modified das rotas de alimentos
+        self.atualizado_em: Optional[datetime] = None
+
+        # Por alimento em obter_muitos e por página em obter_pagina
+        self.acertos = 0
+        self.falhas = 0
+        self.recargas = 0
+
+    @property
+    def valido(self) -> bool:
+        if self._carregado_em is None:
+            return False
+        if self.sincronizado_por_listener or self.snapshot is not None:
+            return True
+        return time.monotonic() - self._carregado_em <= self.ttl_segundos
+
+    @property
+    def completo(self) -> bool:
+        """Indica se o cache contém a coleção inteira e pode responder listagens."""
+        return self._completo and self.valido
+
+    async def carregar(self):
+        if self.snapshot is not None:
+            self.recarregar_do_snapshot()
+            return
+
+        versao, docs = await asyncio.gather(
+            ler_versao(self.db, DOCUMENTO_VERSAO_ALIMENTOS),
+            consultar(self.db.collection("alimentos").limit(self.tamanho_maximo + 1))
+        )
+
+        alimentos = OrderedDict()
+        for doc in docs[:self.tamanho_maximo]:
+            dados = doc.to_dict()
+            alimentos[dados["id"]] = serializar_alimento(dados)
+        completo = len(docs) <= self.tamanho_maximo
+
+        self.atualizado_em = max((doc.update_time for doc in docs if doc.update_time), default=None)
+        self._alimentos = alimentos
+        self._alterado()
+        self._completo = completo
+        self._carregado_em = time.monotonic()
+        self.versao = versao
+        self.recargas += 1
+
+    def recarregar_do_snapshot(self):
+        self._alimentos = OrderedDict(self.snapshot.alimentos())
+        self._alterado()
+        self._completo = True
+        self._carregado_em = time.monotonic()
+        self.versao = self.snapshot.versao
+        self.atualizado_em = self.snapshot.gerado_em
+        self.recargas += 1
+
+    def aplicar_alteracoes(
+            self,
+            alterados: Iterable[dict],
+            removidos: Iterable[str],
+            atualizado_em: Optional[datetime],
+            carga_completa: bool = False
+    ):
+        """Aplica as mudanças recebidas por um listener; carga_completa substitui todo o conteúdo."""
+        alimentos = OrderedDict() if carga_completa else OrderedDict(self._alimentos)
+        for id in removidos:
+            alimentos.pop(id, None)
+        for dados in alterados:
+            alimentos[dados["id"]] = serializar_alimento(dados)
+
+        self._alimentos = alimentos
+        self._alterado()
+        if carga_completa:
+            self._completo = True
+            self._carregado_em = time.monotonic()
+            self.recargas += 1
+        if atualizado_em is not None and (self.atualizado_em is None or atualizado_em > self.atualizado_em):
+            self.atualizado_em = atualizado_em
+
+    def _alterado(self):
+        self._geracao += 1
+        self._paginas.clear()
+
+    def invalidar(self):
+        self._alimentos = OrderedDict()
+        self._alterado()
+        self._completo = False
+        self._carregado_em = None
+
+    async def executar_atualizacao_periodica(self):
+        while True:
+            await asyncio.sleep(self.intervalo_atualizacao)
+            if self.sincronizado_por_listener:
+                continue
+            try:
+                if not self.valido or await ler_versao(self.db, DOCUMENTO_VERSAO_ALIMENTOS) != self.versao:
+                    await self.carregar()
+            except Exception as e:
+                print(f"Erro ao atualizar o catálogo de alimentos: {e}")
+
+    def listar(self) -> list[tuple[str, bytes]]:
+        """Retorna os pares (ID, JSON) de todos os alimentos em cache."""
+        return list(self._alimentos.items())
+
+    async def obter_pagina(self, inicio: Optional[str], limite: int) -> PaginaAlimentos:
+        """Página da listagem ordenada por ID, começando após o ID inicio. Só deve ser usada com o catálogo completo."""
+        chave = (inicio, limite)
+        pagina = self._paginas.get(chave)
+        if pagina is not None:
+            self.acertos += 1
+            self._paginas.move_to_end(chave)
+            return pagina
+
+        self.falhas += 1
+        geracao = self._geracao
+        alimentos = sorted(self.listar())
+        if inicio:
+            alimentos = [(id, alimento) for id, alimento in alimentos if id > inicio]
+        alimentos = alimentos[:limite]
+
+        conteudo = serializar_lista(alimento for _, alimento in alimentos)
+        pagina = PaginaAlimentos(
+            conteudo=await asyncio.to_thread(ConteudoComprimido(conteudo).preparar),
+            etag=calcular_etag(conteudo),
+            ultimo_id=alimentos[-1][0] if len(alimentos) == limite else None
+        )
+
+        if geracao == self._geracao:
+            self._paginas[chave] = pagina
+            while len(self._paginas) > MAXIMO_PAGINAS:
+                self._paginas.popitem(last=False)
+        return pagina
+
+    async def obter_muitos(self, ids: Iterable[str]) -> dict[str, bytes]:
+        ids_unicos = list(dict.fromkeys(ids))
+        valido = self.valido
+        completo = self.completo
+
+        alimentos_map = {}
+        ausentes = []
+        for id in ids_unicos:
+            alimento = self._alimentos.get(id) if valido else None
+            if alimento is None:
+                ausentes.append(id)
+            else:
+                alimentos_map[id] = alimento
+
+        self.acertos += len(alimentos_map)
+        self.falhas += len(ausentes)
+
+        if ausentes and not completo and self.snapshot is None:
+            buscados = await buscar_alimentos_por_ids(self.db, ausentes)
+            alimentos_map.update(buscados)
+            if valido and buscados:
+                self._guardar(buscados)
+
+        return alimentos_map
+
+    def _guardar(self, alimentos: dict[str, bytes]):
+        self._alterado()
+        for id, alimento in alimentos.items():
+            self._alimentos[id] = alimento
+            if len(self._alimentos) > self.tamanho_maximo:
+                self._alimentos.popitem(last=False)
+                self._completo = False
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "itens": len(self._alimentos),
+            "paginas": len(self._paginas),
+            "completo": self.completo,
+            "versao": self.versao,
+            "idade_segundos": None if self._carregado_em is None else time.monotonic() - self._carregado_em,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else None,
+            "recargas": self.recargas,
+        }
@@ -0,0 +1,82 @@
+"""
+Coalescência de consultas idênticas (single-flight), com um microcache opcional.
+
+Requisições simultâneas com a mesma chave aguardam uma única execução da consulta, em vez de cada
+uma ir ao Firestore; com ttl_segundos > 0, o resultado ainda atende as requisições que chegam logo
+depois. O resultado é compartilhado entre as requisições e não deve ser alterado por elas.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ConsultasCoalescidas(Generic[T]):
+    def __init__(
+            self,
+            ttl_segundos: Optional[float] = None,
+            max_itens: Optional[int] = None,
+    ):
+        if ttl_segundos is None:
+            ttl_segundos = float(os.getenv("COALESCENCIA_TTL_SEGUNDOS", 1))
+        if max_itens is None:
+            max_itens = int(os.getenv("COALESCENCIA_MAX_ITENS", 256))
+        self.ttl_segundos = ttl_segundos
+        self.max_itens = max_itens
+
+        self._em_andamento: dict[Hashable, asyncio.Future] = {}
+        self._recentes: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        # Incrementada a cada invalidação, para não guardar resultados de consultas iniciadas antes dela
+        self._geracao = 0
+
+        # Atendidas pelo microcache, por uma execução já em andamento e por uma nova execução
+        self.acertos = 0
+        self.compartilhadas = 0
+        self.execucoes = 0
+
+    @property
+    def quantidade(self) -> int:
+        return len(self._recentes)
+
+    def invalidar(self):
+        self._geracao += 1
+        self._recentes.clear()
+
+    async def obter(self, chave: Hashable, consultar: Callable[[], Awaitable[T]]) -> T:
+        recente = self._recentes.get(chave)
+        if recente is not None:
+            criado_em, valor = recente
+            if time.monotonic() - criado_em <= self.ttl_segundos:
+                self._recentes.move_to_end(chave)
+                self.acertos += 1
+                return valor
+            del self._recentes[chave]
+
+        execucao = self._em_andamento.get(chave)
+        if execucao is None:
+            self.execucoes += 1
+            execucao = asyncio.ensure_future(self._executar(chave, consultar))
+            self._em_andamento[chave] = execucao
+            execucao.add_done_callback(lambda _: self._finalizar(chave, execucao))
+        else:
+            self.compartilhadas += 1
+        # Uma requisição cancelada (cliente desconectado) não cancela a consulta das demais
+        return await asyncio.shield(execucao)
+
+    async def _executar(self, chave: Hashable, consultar: Callable[[], Awaitable[T]]) -> T:
+        geracao = self._geracao
+        valor = await consultar()
+        if self.ttl_segundos > 0 and geracao == self._geracao:
+            self._recentes[chave] = (time.monotonic(), valor)
+            while len(self._recentes) > self.max_itens:
+                self._recentes.popitem(last=False)
+        return valor
+
+    def _finalizar(self, chave: Hashable, execucao: asyncio.Future):
+        self._em_andamento.pop(chave, None)
+        # Marca a exceção como observada mesmo que todas as requisições que aguardavam tenham sido canceladas
+        if not execucao.cancelled():
+            execucao.exception()
@@ -0,0 +1,347 @@
+"""Consultas de cardápios no Firestore, compartilhadas pelas rotas e pelos pacotes semanais"""
+import asyncio
+import dataclasses
+import functools
+import heapq
+import itertools
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_document import DocumentSnapshot
+
+from cache_http import calcular_etag
+from catalogo import CatalogoAlimentos
+from dados import COLECAO_CARDAPIOS_COMPLETOS, consultar, obter_documentos
+from indice import IndiceCardapios
+from paginacao import ORDEM_CARDAPIOS, chave_de_ordenacao
+from serializacao import serializar_cardapio, serializar_cardapio_completo, serializar_lista
+from snapshot import SnapshotCardapios
+
+# Filtros de igualdade que aceitam vários valores (cláusulas "in")
+CAMPOS_MULTIVALORADOS = ("campus", "tipo_refeicao", "fornecedor")
+# Acima disso, as combinações não são divididas e vão em uma única consulta com várias cláusulas "in"
+MAXIMO_CONSULTAS_PARALELAS = 30
+# Máximo de IDs calculados a partir dos filtros lidos com get_all em vez de uma consulta
+MAXIMO_IDS_LEITURA_DIRETA = 100
+
+
+@dataclasses.dataclass(frozen=True)
+class FiltrosCardapios:
+    campus: tuple[str, ...] = ()
+    tipo_refeicao: tuple[str, ...] = ()
+    fornecedor: tuple[str, ...] = ()
+    data: Optional[date] = None
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+
+    def normalizados(self) -> "FiltrosCardapios":
+        """
+        Forma canônica de filtros que retornam os mesmos cardápios: valores ordenados e sem repetição,
+        e um período de um único dia como data. Usada como chave da coalescência das consultas.
+        """
+        data, data_inicio, data_fim = self.data, self.data_inicio, self.data_fim
+        if data:
+            data_inicio = data_fim = None
+        elif data_inicio and data_inicio == data_fim:
+            data, data_inicio, data_fim = data_inicio, None, None
+        return FiltrosCardapios(
+            **{campo: tuple(sorted(set(getattr(self, campo)))) for campo in CAMPOS_MULTIVALORADOS},
+            data=data,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+
+
+@dataclasses.dataclass
+class ResultadoCardapios:
+    # Documentos como vieram do Firestore (ou do índice) e o JSON de cada CardapioCompleto, na mesma ordem
+    cardapios: list[dict]
+    conteudos: list[bytes]
+    ultima_modificacao: Optional[datetime]
+    # Campos de ordenação do último cardápio, quando a página veio cheia
+    ultimo_item: Optional[dict] = None
+
+    @property
+    def datas(self) -> list[date]:
+        return [date.fromisoformat(cardapio["data"]) for cardapio in self.cardapios]
+
+    def serializar(self) -> bytes:
+        return serializar_lista(self.conteudos)
+
+    # Calculados uma vez, já que o resultado pode atender várias requisições (ver coalescencia.py)
+    @functools.cached_property
+    def conteudo(self) -> bytes:
+        return self.serializar()
+
+    @functools.cached_property
+    def etag(self) -> str:
+        return calcular_etag(self.conteudo)
+
+
+def campos_de_ordenacao(filtros: FiltrosCardapios) -> tuple[str, ...]:
+    """
+    Campos de ORDEM_CARDAPIOS pelos quais a consulta precisa ordenar: um campo fixado por uma igualdade
+    tem o mesmo valor em todos os resultados e não muda a ordem, e deixá-lo de fora reduz os índices
+    compostos necessários. Esses índices estão em firestore.indexes.json (publicado com
+    "firebase deploy --only firestore:indexes"), que precisa acompanhar novos formatos de consulta.
+    O cursor continua com todos os campos; o cliente do Firestore usa só os ordenados. Quando todos
+    são fixados há no máximo um cardápio, e ids_determinados já atende esse caso.
+    """
+    fixados = {campo for campo in ("campus", "tipo_refeicao") if len(getattr(filtros, campo)) == 1}
+    if filtros.data:
+        fixados.add("data")
+    return tuple(campo for campo in ORDEM_CARDAPIOS if campo not in fixados) or ORDEM_CARDAPIOS
+
+
+def montar_consulta(
+        db: firestore.Client,
+        colecao: str,
+        filtros: FiltrosCardapios,
+        limite: Optional[int] = None,
+        inicio: Optional[dict] = None
+) -> firestore.Query:
+    query = db.collection(colecao)
+
+    for campo in CAMPOS_MULTIVALORADOS:
+        valores = getattr(filtros, campo)
+        if len(valores) == 1:
+            query = query.where(campo, "==", valores[0])
+        elif valores:
+            query = query.where(campo, "in", list(valores))
+
+    if filtros.data:
+        query = query.where("data", "==", filtros.data.isoformat())
+    else:
+        if filtros.data_inicio:
+            query = query.where("data", ">=", filtros.data_inicio.isoformat())
+        if filtros.data_fim:
+            query = query.where("data", "<=", filtros.data_fim.isoformat())
+
+    for campo in campos_de_ordenacao(filtros):
+        query = query.order_by(campo)
+    if inicio:
+        query = query.start_after(inicio)
+    if limite is not None:
+        query = query.limit(limite)
+    return query
+
+
+def ids_determinados(filtros: FiltrosCardapios, inicio: Optional[dict] = None) -> Optional[list[str]]:
+    """
+    Como Cardapio.id é {campus}_{data}_{tipo_refeicao}, filtros com campus, tipo de refeição e uma data
+    (ou um período curto) determinam os IDs possíveis. Retorna esses IDs na ordem da listagem, após o
+    cursor, ou None quando os filtros não os determinam ou eles passam de MAXIMO_IDS_LEITURA_DIRETA.
+    """
+    if not filtros.campus or not filtros.tipo_refeicao:
+        return None
+    if filtros.data:
+        primeiro_dia = ultimo_dia = filtros.data
+    elif filtros.data_inicio and filtros.data_fim:
+        primeiro_dia, ultimo_dia = filtros.data_inicio, filtros.data_fim
+    else:
+        return None
+
+    dias = [primeiro_dia + timedelta(days=deslocamento) for deslocamento in range((ultimo_dia - primeiro_dia).days + 1)]
+    campi, tipos_refeicao = set(filtros.campus), set(filtros.tipo_refeicao)
+    if len(dias) * len(campi) * len(tipos_refeicao) > MAXIMO_IDS_LEITURA_DIRETA:
+        return None
+
+    chaves = sorted(itertools.product((dia.isoformat() for dia in dias), campi, tipos_refeicao))
+    if inicio:
+        corte = chave_de_ordenacao(inicio, ORDEM_CARDAPIOS)
+        chaves = [chave for chave in chaves if chave > corte]
+    return [f"{campus}_{data}_{tipo_refeicao}" for data, campus, tipo_refeicao in chaves]
+
+
+async def ler_por_ids(
+        db: firestore.Client,
+        colecao: str,
+        filtros: FiltrosCardapios,
+        ids: list[str],
+        limite: Optional[int] = None
+) -> list[tuple[DocumentSnapshot, dict]]:
+    """
+    Lê os IDs com get_all, em lotes do tamanho da página, até reunir limite cardápios existentes
+    que atendam ao filtro de fornecedor (o único que não faz parte do ID).
+    """
+    colecao_ref = db.collection(colecao)
+    tamanho_lote = limite or len(ids) or 1
+    encontrados = []
+    for posicao in range(0, len(ids), tamanho_lote):
+        lote = ids[posicao:posicao + tamanho_lote]
+        # get_all não garante a ordem dos documentos retornados
+        por_id = {doc.id: doc for doc in await obter_documentos(db, (colecao_ref.document(id) for id in lote)) if doc.exists}
+        for id in lote:
+            doc = por_id.get(id)
+            if doc is None:
+                continue
+            cardapio = doc.to_dict()
+            if filtros.fornecedor and cardapio["fornecedor"] not in filtros.fornecedor:
+                continue
+            encontrados.append((doc, cardapio))
+            if len(encontrados) == limite:
+                return encontrados
+    return encontrados
+
+
+def planejar_consultas(filtros: FiltrosCardapios) -> list[FiltrosCardapios]:
+    """
+    Divide os filtros em consultas que o Firestore executa com no máximo uma cláusula "in".
+    Com dois ou mais filtros de vários valores, cada combinação dos valores vira uma consulta
+    só com igualdades (campus=X, tipo_refeicao=Y, ...), que não depende de índices para disjunções;
+    os resultados são reunidos por mesclar_resultados.
+    """
+    valores = {campo: tuple(dict.fromkeys(getattr(filtros, campo))) for campo in CAMPOS_MULTIVALORADOS}
+    filtros = dataclasses.replace(filtros, **valores)
+    if sum(len(valores_campo) > 1 for valores_campo in valores.values()) <= 1:
+        return [filtros]
+
+    opcoes = [[(valor,) for valor in valores[campo]] or [()] for campo in CAMPOS_MULTIVALORADOS]
+    quantidade = 1
+    for opcoes_campo in opcoes:
+        quantidade *= len(opcoes_campo)
+    if quantidade > MAXIMO_CONSULTAS_PARALELAS:
+        return [filtros]
+
+    return [
+        dataclasses.replace(filtros, **dict(zip(CAMPOS_MULTIVALORADOS, combinacao)))
+        for combinacao in itertools.product(*opcoes)
+    ]
+
+
+def mesclar_resultados(
+        resultados: list[list[tuple[DocumentSnapshot, dict]]],
+        limite: Optional[int] = None
+) -> list[tuple[DocumentSnapshot, dict]]:
+    """
+    Intercala resultados já ordenados por ORDEM_CARDAPIOS, descartando IDs repetidos
+    e parando assim que limite cardápios forem reunidos.
+    """
+    if len(resultados) == 1:
+        return resultados[0][:limite]
+
+    def sem_repetidos() -> Iterator[tuple[DocumentSnapshot, dict]]:
+        vistos = set()
+        for doc, cardapio in heapq.merge(*resultados, key=lambda item: chave_de_ordenacao(item[1], ORDEM_CARDAPIOS)):
+            if doc.id not in vistos:
+                vistos.add(doc.id)
+                yield doc, cardapio
+
+    return list(itertools.islice(sem_repetidos(), limite))
+
+
+async def consultar_planejado(
+        db: firestore.Client,
+        colecao: str,
+        filtros: FiltrosCardapios,
+        limite: Optional[int] = None,
+        inicio: Optional[dict] = None
+) -> list[tuple[DocumentSnapshot, dict]]:
+    """
+    Lê diretamente os IDs quando os filtros os determinam (ids_determinados); caso contrário, executa
+    em paralelo as consultas de planejar_consultas e mescla os resultados, na ordem da listagem.
+    """
+    ids = ids_determinados(filtros, inicio)
+    if ids is not None:
+        return await ler_por_ids(db, colecao, filtros, ids, limite)
+
+    planos = planejar_consultas(filtros)
+    resultados = await asyncio.gather(
+        *(consultar(montar_consulta(db, colecao, plano, limite, inicio)) for plano in planos)
+    )
+    return mesclar_resultados([[(doc, doc.to_dict()) for doc in docs] for docs in resultados], limite)
+
+
+async def completar(catalogo: CatalogoAlimentos, cardapios_base: list[dict]) -> list[bytes]:
+    """Serializa os cardápios com os alimentos do catálogo, ignorando os IDs que não estão nele."""
+    alimentos_map = await catalogo.obter_muitos(
+        (id for cardapio_base in cardapios_base for id in cardapio_base["id_alimentos"])
+    )
+    return [
+        serializar_cardapio(cardapio_base, (alimentos_map[id] for id in cardapio_base["id_alimentos"] if id in alimentos_map))
+        for cardapio_base in cardapios_base
+    ]
+
+
+async def completar_do_indice(
+        indice: IndiceCardapios | SnapshotCardapios,
+        catalogo: CatalogoAlimentos,
+        cardapios_base: list[dict]
+) -> list[bytes]:
+    """O snapshot já guarda o JSON de cada CardapioCompleto; no índice ao vivo, os alimentos vêm do catálogo."""
+    if isinstance(indice, SnapshotCardapios):
+        return indice.conteudos(cardapios_base)
+    return await completar(catalogo, cardapios_base)
+
+
+async def _buscar_no_indice(
+        indice: IndiceCardapios | SnapshotCardapios,
+        catalogo: CatalogoAlimentos,
+        filtros: FiltrosCardapios,
+        limite: Optional[int],
+        inicio: Optional[dict]
+) -> ResultadoCardapios:
+    data_inicio = filtros.data or filtros.data_inicio
+    data_fim = filtros.data or filtros.data_fim
+    cardapios_base = indice.filtrar(
+        campus=filtros.campus,
+        tipo_refeicao=filtros.tipo_refeicao,
+        fornecedor=filtros.fornecedor,
+        data_inicio=data_inicio.isoformat() if data_inicio else None,
+        data_fim=data_fim.isoformat() if data_fim else None,
+        limite=limite,
+        inicio=tuple(inicio[campo] for campo in ORDEM_CARDAPIOS) if inicio else None
+    )
+
+    ultimo_item = None
+    if limite is not None and len(cardapios_base) == limite:
+        ultimo_item = cardapios_base[-1]
+
+    return ResultadoCardapios(
+        cardapios=cardapios_base,
+        conteudos=await completar_do_indice(indice, catalogo, cardapios_base),
+        ultima_modificacao=max(
+            (data for data in (indice.atualizado_em(cardapio["id"]) for cardapio in cardapios_base) if data),
+            default=None
+        ),
+        ultimo_item=ultimo_item
+    )
+
+
+async def buscar_cardapios(
+        db: firestore.Client,
+        catalogo: CatalogoAlimentos,
+        usar_cardapios_completos: bool,
+        filtros: FiltrosCardapios,
+        limite: Optional[int] = None,
+        inicio: Optional[dict] = None,
+        indice: Optional[IndiceCardapios | SnapshotCardapios] = None
+) -> ResultadoCardapios:
+    """
+    Usa o índice em memória quando ele está pronto (o snapshot sempre está); caso contrário, consulta o Firestore.
+    Os documentos foram validados pelo scraper ao serem gravados e são serializados sem passar pelos modelos.
+    """
+    if indice is not None and indice.pronto:
+        return await _buscar_no_indice(indice, catalogo, filtros, limite, inicio)
+
+    colecao = COLECAO_CARDAPIOS_COMPLETOS if usar_cardapios_completos else "cardapios"
+    encontrados = await consultar_planejado(db, colecao, filtros, limite, inicio)
+
+    docs = [doc for doc, _ in encontrados]
+    cardapios = [cardapio for _, cardapio in encontrados]
+    if usar_cardapios_completos:
+        conteudos = [serializar_cardapio_completo(cardapio) for cardapio in cardapios]
+    else:
+        conteudos = await completar(catalogo, cardapios)
+
+    ultimo_item = None
+    if limite is not None and len(docs) == limite:
+        ultimo_item = cardapios[-1]
+
+    return ResultadoCardapios(
+        cardapios=cardapios,
+        conteudos=conteudos,
+        ultima_modificacao=max((doc.update_time for doc in docs if doc.update_time), default=None),
+        ultimo_item=ultimo_item
+    )
@@ -0,0 +1,61 @@
+"""
+Acesso assíncrono ao Firestore.
+O firestore.Client é síncrono: cada chamada que faz uma viagem de rede é executada em um
+conjunto limitado de threads, para não bloquear o event loop do uvicorn.
+"""
+import asyncio
+import functools
+import os
+from typing import Callable, Iterable, Optional, TypeVar
+
+from anyio import CapacityLimiter, to_thread
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_document import DocumentSnapshot
+
+T = TypeVar("T")
+
+# Quantidade máxima de chamadas simultâneas ao Firestore por processo
+_limitador = CapacityLimiter(int(os.getenv("FIRESTORE_MAX_THREADS", 32)))
+
+# Quantidade máxima de documentos pedidos em uma única chamada a get_all
+TAMANHO_LOTE_GET_ALL = 100
+
+# Nomes compartilhados entre a API e o scraper (scraping/mandar_para_firestore.py), que grava esses documentos
+# Cópia dos cardápios com os alimentos embutidos
+COLECAO_CARDAPIOS_COMPLETOS = "cardapios_completos"
+COLECAO_METADADOS = "metadados"
+# Campo "versao" alterado a cada upload com mudanças nos cardápios
+DOCUMENTO_VERSAO_CARDAPIOS = "cardapios"
+# Campo "versao" publicado pelo scraper quando os alimentos mudam
+DOCUMENTO_VERSAO_ALIMENTOS = "alimentos"
+# Campo "completo" indica que COLECAO_CARDAPIOS_COMPLETOS cobre todo o histórico
+DOCUMENTO_MATERIALIZACAO = "cardapios_completos"
+
+
+async def em_thread(funcao: Callable[..., T], *args, **kwargs) -> T:
+    return await to_thread.run_sync(functools.partial(funcao, *args, **kwargs), limiter=_limitador)
+
+
+async def obter_documento(ref: firestore.DocumentReference) -> DocumentSnapshot:
+    return await em_thread(ref.get)
+
+
+async def ler_versao(db: firestore.Client, documento: str) -> Optional[str]:
+    """Campo "versao" de um documento de metadados (DOCUMENTO_VERSAO_*), como texto, ou None se não houver."""
+    doc = await obter_documento(db.collection(COLECAO_METADADOS).document(documento))
+    if not doc.exists:
+        return None
+    versao = (doc.to_dict() or {}).get("versao")
+    return None if versao is None else str(versao)
+
+
+async def consultar(query: firestore.Query) -> list[DocumentSnapshot]:
+    return await em_thread(lambda: list(query.stream()))
+
+
+async def obter_documentos(db: firestore.Client, refs: Iterable[firestore.DocumentReference]) -> list[DocumentSnapshot]:
+    """Busca os documentos com get_all, em lotes executados concorrentemente."""
+    refs = list(refs)
+    lotes = [refs[inicio:inicio + TAMANHO_LOTE_GET_ALL] for inicio in range(0, len(refs), TAMANHO_LOTE_GET_ALL)]
+    resultados = await asyncio.gather(*(em_thread(lambda lote=lote: list(db.get_all(lote))) for lote in lotes))
+    return [doc for resultado in resultados for doc in resultado]
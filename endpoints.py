@@ -1,54 +1,256 @@
-from contextlib import asynccontextmanager
+import asyncio
+import os
+import secrets
+from contextlib import asynccontextmanager, suppress
 from datetime import date
+from pathlib import Path
 from typing import Optional, cast
 
-from fastapi import FastAPI, HTTPException, Request, Depends, Query
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Query, Header
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 from google.cloud import firestore
+from pydantic import TypeAdapter
 from starlette.datastructures import State
 
 from auth import get_firestore_client
-from modelos import Campus, Fornecedor, Cardapio, TipoRefeicao, Alimento, CardapioCompleto
+from cache_http import (
+    CACHE_CONTROL_CATALOGO,
+    CACHE_CONTROL_ESTATICO,
+    cache_control_para_datas,
+    hoje_na_ufs,
+    resposta_condicional,
+)
+from catalogo import CatalogoAlimentos
+from coalescencia import ConsultasCoalescidas
+from compressao import CompressaoMiddleware
+from consultas import (
+    FiltrosCardapios,
+    buscar_cardapios,
+    completar,
+    completar_do_indice,
+)
+from dados import (
+    COLECAO_CARDAPIOS_COMPLETOS,
+    COLECAO_METADADOS,
+    DOCUMENTO_MATERIALIZACAO,
+    consultar,
+    obter_documento,
+)
+from exportacao import TAMANHO_LOTE_EXPORTACAO, TIPOS_DE_MIDIA, exportar_cardapios, validar_campos
+from indice import IndiceCardapios
+from metricas import MetricasMiddleware, instrumentar, registrar_coletor_caches
+from modelos import Campus, Fornecedor, TipoRefeicao, Alimento, CardapioCompleto
+from pacote_semanal import PacotesSemanais, periodo_da_semana, semana_da_data
+from paginacao import (
+    ORDEM_ALIMENTOS,
+    ORDEM_CARDAPIOS,
+    adicionar_cabecalhos_paginacao,
+    cursor_do_item,
+    decodificar_cursor,
+)
+from serializacao import serializar_alimento, serializar_cardapio_completo, serializar_lista
+from snapshot import SnapshotCardapios
+
+
+_adaptador_valores = TypeAdapter(list[str])
+
+
+async def _cardapios_completos_disponiveis(db: firestore.Client) -> bool:
+    """A coleção materializada só é usada depois que o scraper a reconstruiu com todo o histórico."""
+    try:
+        doc = await obter_documento(db.collection(COLECAO_METADADOS).document(DOCUMENTO_MATERIALIZACAO))
+    except Exception as e:
+        print(f"Não foi possível verificar a coleção de cardápios completos: {e}")
+        return False
+    return doc.exists and bool((doc.to_dict() or {}).get("completo"))
+
+
+async def _aguardar_cardapios_completos(app: FastAPI):
+    """
+    Passa a usar a coleção materializada quando o scraper termina de reconstruí-la depois que a API
+    já iniciou, sem precisar reiniciar o processo. Como a coleção não deixa de estar completa, a
+    verificação termina assim que ela fica disponível.
+    """
+    intervalo = float(os.getenv("CARDAPIOS_COMPLETOS_INTERVALO_VERIFICACAO", 60))
+    while not app.state.usar_cardapios_completos:
+        await asyncio.sleep(intervalo)
+        if await _cardapios_completos_disponiveis(app.state.db):
+            app.state.usar_cardapios_completos = True
+            app.state.pacotes_semanais.usar_cardapios_completos = True
+            print("Coleção de cardápios completos disponível; passando a usá-la.")
+
+
+async def _iniciar_indice(db: firestore.Client, catalogo: CatalogoAlimentos) -> Optional[IndiceCardapios]:
+    """Inicia os listeners do índice em memória (desativado com INDICE_AO_VIVO=0) e aguarda a carga inicial."""
+    if os.getenv("INDICE_AO_VIVO", "1") == "0":
+        return None
+
+    indice = IndiceCardapios(db, catalogo)
+    try:
+        indice.iniciar()
+    except Exception as e:
+        print(f"Não foi possível iniciar o índice de cardápios: {e}")
+        return None
+
+    if not await asyncio.to_thread(indice.aguardar, float(os.getenv("INDICE_TIMEOUT_INICIAL", 30))):
+        print("Índice de cardápios ainda carregando; consultas irão ao Firestore até que fique pronto.")
+    return indice
+
+
+async def _iniciar_com_firestore(app: FastAPI) -> list[asyncio.Task]:
+    # Um cliente definido antes da inicialização (como o Firestore falso dos benchmarks) é mantido
+    if getattr(app.state, "db", None) is None:
+        app.state.db = get_firestore_client()
+    # Leituras e chamadas ao Firestore são contadas por rota (ver metricas.py)
+    app.state.db = instrumentar(app.state.db)
+
+    app.state.usar_cardapios_completos = await _cardapios_completos_disponiveis(app.state.db)
+
+    app.state.catalogo = CatalogoAlimentos(app.state.db)
+    try:
+        await app.state.catalogo.carregar()
+    except Exception as e:
+        print(f"Não foi possível carregar o catálogo de alimentos: {e}")
+
+    app.state.indice = await _iniciar_indice(app.state.db, app.state.catalogo)
+
+    app.state.pacotes_semanais = PacotesSemanais(
+        app.state.db,
+        app.state.catalogo,
+        app.state.usar_cardapios_completos,
+        app.state.indice
+    )
+    app.state.consultas_cardapios = ConsultasCoalescidas()
+    if app.state.indice is not None:
+        loop = asyncio.get_running_loop()
+        app.state.indice.ao_alterar = lambda: loop.call_soon_threadsafe(_invalidar_resultados, app)
+
+    return [
+        asyncio.create_task(app.state.catalogo.executar_atualizacao_periodica()),
+        asyncio.create_task(app.state.pacotes_semanais.executar_atualizacao_periodica()),
+        asyncio.create_task(_aguardar_cardapios_completos(app)),
+    ]
+
+
+def _invalidar_resultados(app: FastAPI):
+    """Descarta os resultados guardados depois de uma alteração nos cardápios."""
+    app.state.pacotes_semanais.invalidar()
+    app.state.consultas_cardapios.invalidar()
+
+
+def _iniciar_com_snapshot(app: FastAPI, caminho: Path) -> list[asyncio.Task]:
+    """
+    Modo snapshot (SNAPSHOT_CARDAPIOS): todas as rotas leem o arquivo gerado pelo scraper (ver snapshot.py),
+    que faz o papel do índice e do catálogo, sem cliente do Firestore.
+    """
+    snapshot = SnapshotCardapios(caminho)
+    app.state.db = None
+    app.state.usar_cardapios_completos = False
+    app.state.indice = snapshot
+    app.state.catalogo = CatalogoAlimentos(None, snapshot=snapshot)
+    app.state.catalogo.recarregar_do_snapshot()
+    app.state.pacotes_semanais = PacotesSemanais(None, app.state.catalogo, False, snapshot)
+    app.state.consultas_cardapios = ConsultasCoalescidas()
+
+    def ao_alterar():
+        app.state.catalogo.recarregar_do_snapshot()
+        _invalidar_resultados(app)
+
+    snapshot.ao_alterar = ao_alterar
+    print(f"Modo snapshot: {snapshot.quantidade} cardápios gerados em {snapshot.versao}")
+    return [asyncio.create_task(snapshot.executar_atualizacao_periodica())]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state = cast(State, app.state)
-    app.state.db = get_firestore_client()
+    caminho_snapshot = os.getenv("SNAPSHOT_CARDAPIOS")
+    app.state.modo_snapshot = bool(caminho_snapshot)
+    if caminho_snapshot:
+        tarefas = _iniciar_com_snapshot(app, Path(caminho_snapshot))
+    else:
+        tarefas = await _iniciar_com_firestore(app)
+
+    coletor_caches = registrar_coletor_caches(app.state)
+
     print("Aplicação iniciada")
     yield
+
+    for tarefa in tarefas:
+        tarefa.cancel()
+    for tarefa in tarefas:
+        with suppress(asyncio.CancelledError):
+            await tarefa
+    if app.state.indice is not None:
+        app.state.indice.parar()
+    REGISTRY.unregister(coletor_caches)
     print("Aplicação encerrada")
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(CompressaoMiddleware)
+# Adicionado por último para ser o mais externo e medir também o tempo de compressão
+app.add_middleware(MetricasMiddleware)
 
 
-def get_db(request: Request) -> firestore.Client:
+def get_db(request: Request) -> Optional[firestore.Client]:
+    """No modo snapshot não há cliente do Firestore, e as rotas leem apenas o índice e o catálogo."""
     db = getattr(request.app.state, "db", None)
-    if not db:
+    if not db and not getattr(request.app.state, "modo_snapshot", False):
         raise HTTPException(status_code=503, detail="Firestore não disponível")
     return db
 
 
-async def _obter_alimentos_por_ids(db: firestore.Client, ids: list[str]) -> list[Alimento]:
-    """Função auxiliar para buscar documentos de alimentos por uma lista de IDs."""
-    if not ids:
-        return []
+def get_catalogo(request: Request) -> CatalogoAlimentos:
+    catalogo = getattr(request.app.state, "catalogo", None)
+    if not catalogo:
+        raise HTTPException(status_code=503, detail="Catálogo de alimentos não disponível")
+    return catalogo
 
-    alimentos_map = {}
-    refs = [db.collection("alimentos").document(id) for id in ids]
 
-    docs = db.get_all(refs)
+def get_indice(request: Request) -> Optional[IndiceCardapios | SnapshotCardapios]:
+    return getattr(request.app.state, "indice", None)
 
-    for doc in docs:
-        if doc.exists:
-            alimento = Alimento(**doc.to_dict())
-            alimentos_map[alimento.id] = alimento
 
-    return [alimentos_map[id] for id in ids if id in alimentos_map]
+def get_pacotes_semanais(request: Request) -> PacotesSemanais:
+    pacotes_semanais = getattr(request.app.state, "pacotes_semanais", None)
+    if not pacotes_semanais:
+        raise HTTPException(status_code=503, detail="Pacotes semanais não disponíveis")
+    return pacotes_semanais
+
+
+def get_consultas_cardapios(request: Request) -> Optional[ConsultasCoalescidas]:
+    return getattr(request.app.state, "consultas_cardapios", None)
+
+
+def verificar_token_admin(x_admin_token: Optional[str] = Header(None)):
+    token_esperado = os.getenv("ADMIN_TOKEN")
+    if not token_esperado or not x_admin_token or not secrets.compare_digest(x_admin_token, token_esperado):
+        raise HTTPException(status_code=403, detail="Acesso restrito")
+
+
+def _montar_filtros(
+        campus: Optional[list[Campus]],
+        tipo_refeicao: Optional[list[TipoRefeicao]],
+        fornecedor: Optional[list[Fornecedor]],
+        data: Optional[date],
+        data_inicio: Optional[date],
+        data_fim: Optional[date]
+) -> FiltrosCardapios:
+    return FiltrosCardapios(
+        campus=tuple(c.value for c in campus or ()),
+        tipo_refeicao=tuple(r.value for r in tipo_refeicao or ()),
+        fornecedor=tuple(f.value for f in fornecedor or ()),
+        data=data,
+        data_inicio=data_inicio,
+        data_fim=data_fim
+    )
 
 
 @app.get(path="/cardapios", summary="Obter lista de cardápios", response_model=list[CardapioCompleto])
 async def obter_cardapios(
+        request: Request,
         campus: Optional[list[Campus]] = Query(None),
         tipo_refeicao: Optional[list[TipoRefeicao]] = Query(None),
         fornecedor: Optional[list[Fornecedor]] = Query(None),
@@ -61,100 +263,301 @@ async def obter_cardapios(
             default=10,
             gt=0,
             le=100,
-            description="Número máximo de cardápios a serem retornados."
+            description="Número máximo de cardápios a serem retornados (tamanho da página)."
+        ),
+        cursor: Optional[str] = Query(
+            default=None,
+            description="Cursor da próxima página, informado no cabeçalho X-Next-Cursor da resposta anterior."
         ),
 
-        db: firestore.Client = Depends(get_db)
+        db: firestore.Client = Depends(get_db),
+        catalogo: CatalogoAlimentos = Depends(get_catalogo),
+        indice: Optional[IndiceCardapios | SnapshotCardapios] = Depends(get_indice),
+        consultas_cardapios: Optional[ConsultasCoalescidas] = Depends(get_consultas_cardapios)
 ):
+    inicio = decodificar_cursor(cursor, ORDEM_CARDAPIOS) if cursor else None
+    filtros = _montar_filtros(campus, tipo_refeicao, fornecedor, data, data_inicio, data_fim)
+
+    def consultar():
+        return buscar_cardapios(
+            db,
+            catalogo,
+            request.app.state.usar_cardapios_completos,
+            filtros,
+            limite,
+            inicio,
+            indice
+        )
+
     try:
-        query = db.collection("cardapios")
-
-        if campus:
-            campus_values = [c.value for c in campus]
-            query = query.where("campus", "in", campus_values)
-        if tipo_refeicao:
-            refeicao_values = [r.value for r in tipo_refeicao]
-            query = query.where("tipo_refeicao", "in", refeicao_values)
-        if fornecedor:
-            fornecedor_values = [f.value for f in fornecedor]
-            query = query.where("fornecedor", "in", fornecedor_values)
-
-        if data:
-            query = query.where("data", "==", data.isoformat())
+        if consultas_cardapios is None:
+            resultado = await consultar()
         else:
-            if data_inicio:
-                query = query.where("data", ">=", data_inicio.isoformat())
-            if data_fim:
-                query = query.where("data", "<=", data_fim.isoformat())
-
-        query = query.limit(limite)
-        docs = query.stream()
+            # Requisições simultâneas com os mesmos filtros compartilham uma única consulta
+            resultado = await consultas_cardapios.obter((filtros.normalizados(), limite, cursor), consultar)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao consultar o Firestore: {e}"
+        )
 
-        cardapios_completos = []
-        for doc in docs:
-            cardapio_base = Cardapio(**doc.to_dict())
-            alimentos = await _obter_alimentos_por_ids(db, cardapio_base.id_alimentos)
+    response = resposta_condicional(
+        request,
+        resultado.conteudo,
+        cache_control_para_datas(resultado.datas),
+        resultado.ultima_modificacao,
+        etag=resultado.etag
+    )
+    if resultado.ultimo_item is not None:
+        adicionar_cabecalhos_paginacao(response, request, cursor_do_item(resultado.ultimo_item, ORDEM_CARDAPIOS))
+    return response
+
+
+@app.get(
+    path="/cardapios/semana",
+    summary="Obter os cardápios de todos os campi em uma semana",
+    description="Retorna {\"campi\": {campus: {data: {tipo_refeicao: cardápio}}}} para a semana ISO informada "
+                "(AAAA-Www) ou para a semana atual."
+)
+async def obter_cardapios_da_semana(
+        request: Request,
+        semana: Optional[str] = Query(
+            default=None,
+            pattern=r"^\d{4}-W\d{2}$",
+            description="Semana no formato ISO 8601, por exemplo 2025-W10."
+        ),
+        pacotes_semanais: PacotesSemanais = Depends(get_pacotes_semanais)
+):
+    semana = semana or semana_da_data(hoje_na_ufs())
+    try:
+        periodo_da_semana(semana)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-            cardapio_dict = cardapio_base.model_dump()
-            del cardapio_dict['id_alimentos']
+    try:
+        pacote = await pacotes_semanais.obter(semana)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao consultar o Firestore: {e}"
+        )
 
-            cardapio_completo = CardapioCompleto(**cardapio_dict, id_alimentos=alimentos)
+    return resposta_condicional(
+        request,
+        pacote.conteudo,
+        cache_control_para_datas([pacote.fim]),
+        pacote.ultima_modificacao,
+        etag=pacote.etag
+    )
+
+
+# Registrada antes de /cardapios/{id_cardapio}, que também corresponderia a este caminho
+@app.get(
+    path="/cardapios/export",
+    summary="Exportar cardápios em NDJSON ou CSV",
+    description="Envia todos os cardápios que atendem aos filtros, sem paginação, um por linha. "
+                "No CSV, a coluna id_alimentos traz apenas os IDs dos alimentos, separados por ';'."
+)
+async def exportar(
+        request: Request,
+        formato: str = Query(default="ndjson", pattern=r"^(ndjson|csv)$"),
+        campos: Optional[list[str]] = Query(
+            default=None,
+            description="Campos exportados, na ordem desejada (padrão: todos os campos de CardapioCompleto)."
+        ),
+        campus: Optional[list[Campus]] = Query(None),
+        tipo_refeicao: Optional[list[TipoRefeicao]] = Query(None),
+        fornecedor: Optional[list[Fornecedor]] = Query(None),
 
-            cardapios_completos.append(cardapio_completo)
+        data: Optional[date] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
 
-        return cardapios_completos
+        db: firestore.Client = Depends(get_db),
+        catalogo: CatalogoAlimentos = Depends(get_catalogo),
+        indice: Optional[IndiceCardapios | SnapshotCardapios] = Depends(get_indice)
+):
+    try:
+        campos_validos = validar_campos(campos)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
+    filtros = _montar_filtros(campus, tipo_refeicao, fornecedor, data, data_inicio, data_fim)
+    usar_cardapios_completos = request.app.state.usar_cardapios_completos
+    try:
+        primeira_pagina = await buscar_cardapios(
+            db, catalogo, usar_cardapios_completos, filtros, TAMANHO_LOTE_EXPORTACAO, None, indice
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao consultar o Firestore: {e}"
         )
 
+    return StreamingResponse(
+        exportar_cardapios(
+            db, catalogo, usar_cardapios_completos, filtros, formato, campos_validos, indice, primeira_pagina
+        ),
+        media_type=TIPOS_DE_MIDIA[formato],
+        headers={"Content-Disposition": f'attachment; filename="cardapios.{formato}"'}
+    )
+
 
 @app.get(path="/cardapios/{id_cardapio}", summary="Obter cardápio pelo ID", response_model=CardapioCompleto)
-async def obter_cardapio_dado_id(id_cardapio: str, db: firestore.Client = Depends(get_db)):
-    doc_ref = db.collection("cardapios").document(id_cardapio)
-    doc = doc_ref.get()
+async def obter_cardapio_dado_id(
+        id_cardapio: str,
+        request: Request,
+        db: firestore.Client = Depends(get_db),
+        catalogo: CatalogoAlimentos = Depends(get_catalogo),
+        indice: Optional[IndiceCardapios | SnapshotCardapios] = Depends(get_indice)
+):
+    if indice is not None and indice.pronto:
+        cardapio_base = indice.obter(id_cardapio)
+        if cardapio_base is None:
+            raise HTTPException(status_code=404, detail="Cardápio não encontrado")
+        conteudo, = await completar_do_indice(indice, catalogo, [cardapio_base])
+        return _responder_cardapio(request, cardapio_base, conteudo, indice.atualizado_em(id_cardapio))
+
+    if request.app.state.usar_cardapios_completos:
+        doc = await obter_documento(db.collection(COLECAO_CARDAPIOS_COMPLETOS).document(id_cardapio))
+        if doc.exists:
+            cardapio = doc.to_dict()
+            return _responder_cardapio(request, cardapio, serializar_cardapio_completo(cardapio), doc.update_time)
+
+    # Cardápios ainda não materializados pelo scraper são montados a partir das duas coleções
+    doc = await obter_documento(db.collection("cardapios").document(id_cardapio))
 
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Cardápio não encontrado")
 
-    cardapio_base = Cardapio(**doc.to_dict())
-    alimentos = await _obter_alimentos_por_ids(db, cardapio_base.id_alimentos)
+    cardapio_base = doc.to_dict()
+    conteudo, = await completar(catalogo, [cardapio_base])
+
+    return _responder_cardapio(request, cardapio_base, conteudo, doc.update_time)
 
-    cardapio_dict = cardapio_base.model_dump()
-    del cardapio_dict['id_alimentos']
 
-    return CardapioCompleto(**cardapio_dict, id_alimentos=alimentos)
+def _responder_cardapio(request: Request, cardapio: dict, conteudo: bytes, ultima_modificacao) -> Response:
+    return resposta_condicional(
+        request,
+        conteudo,
+        cache_control_para_datas([date.fromisoformat(cardapio["data"])]),
+        ultima_modificacao
+    )
 
 
 @app.get(path="/alimentos", summary="Obter lista de todos os alimentos", response_model=list[Alimento])
-async def obter_alimentos(db: firestore.Client = Depends(get_db)):
-    docs = db.collection("alimentos").stream()
-    return [Alimento(**doc.to_dict()) for doc in docs]
+async def obter_alimentos(
+        request: Request,
+        limite: int = Query(
+            default=500,
+            gt=0,
+            le=1000,
+            description="Número máximo de alimentos a serem retornados (tamanho da página)."
+        ),
+        cursor: Optional[str] = Query(
+            default=None,
+            description="Cursor da próxima página, informado no cabeçalho X-Next-Cursor da resposta anterior."
+        ),
+        db: firestore.Client = Depends(get_db),
+        catalogo: CatalogoAlimentos = Depends(get_catalogo)
+):
+    inicio = decodificar_cursor(cursor, ORDEM_ALIMENTOS) if cursor else None
+
+    if catalogo.completo:
+        pagina = await catalogo.obter_pagina(inicio["id"] if inicio else None, limite)
+        response = resposta_condicional(
+            request,
+            pagina.conteudo,
+            CACHE_CONTROL_CATALOGO,
+            catalogo.atualizado_em,
+            etag=pagina.etag
+        )
+        ultimo_id = pagina.ultimo_id
+    else:
+        query = db.collection("alimentos").order_by("id")
+        if inicio:
+            query = query.start_after(inicio)
+        docs = await consultar(query.limit(limite))
+        alimentos = [doc.to_dict() for doc in docs]
+        response = resposta_condicional(
+            request,
+            serializar_lista(serializar_alimento(alimento) for alimento in alimentos),
+            CACHE_CONTROL_CATALOGO,
+            max((doc.update_time for doc in docs if doc.update_time), default=None)
+        )
+        ultimo_id = alimentos[-1]["id"] if len(alimentos) == limite else None
+
+    if ultimo_id is not None:
+        adicionar_cabecalhos_paginacao(response, request, cursor_do_item({"id": ultimo_id}, ORDEM_ALIMENTOS))
+    return response
 
 
 @app.get(path="/alimentos/{id_alimento}", summary="Obter alimento pelo ID", response_model=Alimento)
-async def obter_alimento_dado_id(id_alimento: str, db: firestore.Client = Depends(get_db)):
-    doc_ref = db.collection("alimentos").document(id_alimento)
-    doc = doc_ref.get()
+async def obter_alimento_dado_id(
+        id_alimento: str,
+        request: Request,
+        catalogo: CatalogoAlimentos = Depends(get_catalogo)
+):
+    alimento = (await catalogo.obter_muitos([id_alimento])).get(id_alimento)
 
-    if not doc.exists:
+    if alimento is None:
         raise HTTPException(status_code=404, detail="Alimento não encontrado")
 
-    return Alimento(**doc.to_dict())
-
-
-@app.get(path="/campi", summary="Obter lista de todos os campi")
-def obter_campi():
-    return [campus.value for campus in Campus]
-
-
-@app.get(path="/fornecedores", summary="Obter lista de todos fornecedores")
-def obter_fornecedores():
-    return [fornecedor.value for fornecedor in Fornecedor]
-
-
-@app.get("/tipos-refeicao", summary="Obter lista de todos tipos de refeição")
-def obter_tipos_refeicao():
-    return [refeicao.value for refeicao in TipoRefeicao]
\ No newline at end of file
+    return resposta_condicional(
+        request,
+        alimento,
+        CACHE_CONTROL_CATALOGO,
+        catalogo.atualizado_em
+    )
+
+
+@app.get(
+    path="/admin/cache/alimentos",
+    summary="Estatísticas do cache do catálogo de alimentos",
+    dependencies=[Depends(verificar_token_admin)]
+)
+def obter_estatisticas_catalogo(catalogo: CatalogoAlimentos = Depends(get_catalogo)):
+    return catalogo.estatisticas()
+
+
+@app.post(
+    path="/admin/cache/alimentos/invalidar",
+    summary="Invalidar e recarregar o cache do catálogo de alimentos",
+    dependencies=[Depends(verificar_token_admin)]
+)
+async def invalidar_catalogo(catalogo: CatalogoAlimentos = Depends(get_catalogo)):
+    catalogo.invalidar()
+    await catalogo.carregar()
+    return catalogo.estatisticas()
+
+
+@app.get(path="/campi", summary="Obter lista de todos os campi", response_model=list[str])
+def obter_campi(request: Request):
+    return resposta_condicional(
+        request,
+        _adaptador_valores.dump_json([campus.value for campus in Campus]),
+        CACHE_CONTROL_ESTATICO
+    )
+
+
+@app.get(path="/fornecedores", summary="Obter lista de todos fornecedores", response_model=list[str])
+def obter_fornecedores(request: Request):
+    return resposta_condicional(
+        request,
+        _adaptador_valores.dump_json([fornecedor.value for fornecedor in Fornecedor]),
+        CACHE_CONTROL_ESTATICO
+    )
+
+
+@app.get("/tipos-refeicao", summary="Obter lista de todos tipos de refeição", response_model=list[str])
+def obter_tipos_refeicao(request: Request):
+    return resposta_condicional(
+        request,
+        _adaptador_valores.dump_json([refeicao.value for refeicao in TipoRefeicao]),
+        CACHE_CONTROL_ESTATICO
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def obter_metricas():
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,103 @@
+"""
+Exportação dos cardápios em NDJSON ou CSV, enviada aos poucos com StreamingResponse.
+
+Os cardápios são lidos em páginas de TAMANHO_LOTE_EXPORTACAO por buscar_cardapios, continuando a
+partir do último item de cada página (como o cursor de /cardapios), de modo que valem o índice em
+memória, a coleção materializada e o planejador de consultas, e os alimentos de cada página são
+obtidos do catálogo em lote. Só uma página fica em memória por vez, qualquer que seja o período.
+"""
+import csv
+import io
+from typing import AsyncIterator, Optional
+
+import orjson
+from google.cloud import firestore
+
+from catalogo import CatalogoAlimentos
+from consultas import FiltrosCardapios, ResultadoCardapios, buscar_cardapios
+from indice import IndiceCardapios
+from paginacao import ORDEM_CARDAPIOS
+from snapshot import SnapshotCardapios
+
+TAMANHO_LOTE_EXPORTACAO = 500
+
+# Campos de CardapioCompleto, na ordem do JSON das demais rotas
+CAMPOS_EXPORTACAO = ("campus", "fornecedor", "tipo_refeicao", "data", "id_alimentos", "id")
+TIPOS_DE_MIDIA = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+# No CSV, os alimentos de cada cardápio vão em uma única coluna, com os IDs separados por este caractere
+SEPARADOR_ALIMENTOS_CSV = ";"
+
+
+def validar_campos(campos: Optional[list[str]]) -> Optional[tuple[str, ...]]:
+    """Remove repetições mantendo a ordem pedida; levanta ValueError para campos desconhecidos."""
+    if not campos:
+        return None
+    desconhecidos = [campo for campo in campos if campo not in CAMPOS_EXPORTACAO]
+    if desconhecidos:
+        raise ValueError(
+            f"Campos desconhecidos: {', '.join(desconhecidos)}. Disponíveis: {', '.join(CAMPOS_EXPORTACAO)}"
+        )
+    return tuple(dict.fromkeys(campos))
+
+
+def _linhas_ndjson(resultado: ResultadoCardapios, campos: Optional[tuple[str, ...]]) -> bytes:
+    if campos is None:
+        return b"".join(conteudo + b"\n" for conteudo in resultado.conteudos)
+
+    linhas = []
+    for conteudo in resultado.conteudos:
+        cardapio = orjson.loads(conteudo)
+        linhas.append(orjson.dumps({campo: cardapio[campo] for campo in campos}) + b"\n")
+    return b"".join(linhas)
+
+
+def _valor_csv(cardapio: dict, campo: str) -> str:
+    if campo == "id_alimentos":
+        return SEPARADOR_ALIMENTOS_CSV.join(alimento["id"] for alimento in cardapio["id_alimentos"])
+    return cardapio[campo]
+
+
+def _linhas_csv(resultado: ResultadoCardapios, campos: tuple[str, ...], cabecalho: bool) -> bytes:
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator="\n")
+    if cabecalho:
+        escritor.writerow(campos)
+    for conteudo in resultado.conteudos:
+        cardapio = orjson.loads(conteudo)
+        escritor.writerow([_valor_csv(cardapio, campo) for campo in campos])
+    return saida.getvalue().encode("utf-8")
+
+
+async def exportar_cardapios(
+        db: firestore.Client,
+        catalogo: CatalogoAlimentos,
+        usar_cardapios_completos: bool,
+        filtros: FiltrosCardapios,
+        formato: str,
+        campos: Optional[tuple[str, ...]] = None,
+        indice: Optional[IndiceCardapios | SnapshotCardapios] = None,
+        primeira_pagina: Optional[ResultadoCardapios] = None
+) -> AsyncIterator[bytes]:
+    """
+    Gera o conteúdo da exportação página a página. primeira_pagina, se informada, já foi buscada
+    pela rota (para que uma falha na primeira consulta ainda possa virar um erro HTTP).
+    """
+    resultado = primeira_pagina
+    inicio = None
+    primeira = True
+    while True:
+        if resultado is None:
+            resultado = await buscar_cardapios(
+                db, catalogo, usar_cardapios_completos, filtros, TAMANHO_LOTE_EXPORTACAO, inicio, indice
+            )
+
+        if formato == "csv":
+            yield _linhas_csv(resultado, campos or CAMPOS_EXPORTACAO, cabecalho=primeira)
+        elif resultado.conteudos:
+            yield _linhas_ndjson(resultado, campos)
+
+        if resultado.ultimo_item is None:
+            return
+        inicio = {campo: resultado.ultimo_item[campo] for campo in ORDEM_CARDAPIOS}
+        resultado = None
+        primeira = False
@@ -0,0 +1,154 @@
+"""Índice em memória dos cardápios, mantido atualizado por listeners (on_snapshot) do Firestore"""
+import bisect
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.watch import ChangeType
+
+from catalogo import CatalogoAlimentos
+from modelos import Cardapio
+from paginacao import MAXIMO_CHAVE
+
+
+class IndiceCardapios:
+    """
+    Mantém todos os cardápios em memória, indexados pelo ID e por (campus, data, tipo_refeicao),
+    além de uma lista ordenada por (data, campus, tipo_refeicao, id) usada nas consultas por período.
+    Um listener na coleção de cardápios atualiza o índice e outro na de alimentos atualiza o catálogo,
+    de modo que, após a carga inicial, as leituras não consultam o Firestore.
+
+    Os listeners rodam em threads do cliente do Firestore; as estruturas são trocadas sob um lock.
+    Cada cardápio é validado uma única vez, ao chegar pelo listener, e guardado como dicionário
+    já no formato JSON, para ser serializado diretamente nas leituras (ver serializacao.py).
+    """
+
+    def __init__(self, db: firestore.Client, catalogo: CatalogoAlimentos):
+        self.db = db
+        self.catalogo = catalogo
+
+        self._lock = threading.Lock()
+        self._por_id: dict[str, dict] = {}
+        self._atualizado_em: dict[str, datetime] = {}
+        self._chaves_ordenadas: list[tuple[str, str, str, str]] = []
+
+        self._cardapios_prontos = threading.Event()
+        self._alimentos_prontos = threading.Event()
+        self._assinaturas = []
+
+        # Chamado (na thread do listener) sempre que algum cardápio ou alimento muda
+        self.ao_alterar: Optional[Callable[[], None]] = None
+
+    @property
+    def pronto(self) -> bool:
+        return self._cardapios_prontos.is_set() and self._alimentos_prontos.is_set()
+
+    @property
+    def quantidade(self) -> int:
+        return len(self._por_id)
+
+    def iniciar(self):
+        self._assinaturas = [
+            self.db.collection("cardapios").on_snapshot(self._ao_mudar_cardapios),
+            self.db.collection("alimentos").on_snapshot(self._ao_mudar_alimentos),
+        ]
+
+    def aguardar(self, timeout: float) -> bool:
+        return self._cardapios_prontos.wait(timeout) and self._alimentos_prontos.wait(timeout)
+
+    def parar(self):
+        for assinatura in self._assinaturas:
+            assinatura.unsubscribe()
+        self._assinaturas = []
+        self.catalogo.sincronizado_por_listener = False
+
+    @staticmethod
+    def _chave(cardapio: dict) -> tuple[str, str, str, str]:
+        return cardapio["data"], cardapio["campus"], cardapio["tipo_refeicao"], cardapio["id"]
+
+    def _ao_mudar_cardapios(self, _snapshot, changes, _read_time):
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                anterior = self._por_id.pop(doc.id, None)
+                self._atualizado_em.pop(doc.id, None)
+                if anterior is not None:
+                    chave = self._chave(anterior)
+                    posicao = bisect.bisect_left(self._chaves_ordenadas, chave)
+                    if posicao < len(self._chaves_ordenadas) and self._chaves_ordenadas[posicao] == chave:
+                        del self._chaves_ordenadas[posicao]
+
+                if change.type == ChangeType.REMOVED:
+                    continue
+
+                cardapio = Cardapio(**doc.to_dict()).model_dump(mode="json")
+                self._por_id[doc.id] = cardapio
+                if doc.update_time:
+                    self._atualizado_em[doc.id] = doc.update_time
+                bisect.insort(self._chaves_ordenadas, self._chave(cardapio))
+
+        self._cardapios_prontos.set()
+        self._notificar()
+
+    def _ao_mudar_alimentos(self, _snapshot, changes, _read_time):
+        carga_completa = not self._alimentos_prontos.is_set()
+        alterados, removidos = [], []
+        for change in changes:
+            if change.type == ChangeType.REMOVED:
+                removidos.append(change.document.id)
+            else:
+                alterados.append(change.document.to_dict())
+
+        atualizado_em = max((change.document.update_time for change in changes if change.document.update_time), default=None)
+        self.catalogo.aplicar_alteracoes(alterados, removidos, atualizado_em, carga_completa)
+        self.catalogo.sincronizado_por_listener = True
+
+        self._alimentos_prontos.set()
+        self._notificar()
+
+    def _notificar(self):
+        if self.ao_alterar is not None and self.pronto:
+            self.ao_alterar()
+
+    def obter(self, id_cardapio: str) -> Optional[dict]:
+        return self._por_id.get(id_cardapio)
+
+    def atualizado_em(self, id_cardapio: str) -> Optional[datetime]:
+        return self._atualizado_em.get(id_cardapio)
+
+    def filtrar(
+            self,
+            campus: tuple[str, ...] = (),
+            tipo_refeicao: tuple[str, ...] = (),
+            fornecedor: tuple[str, ...] = (),
+            data_inicio: Optional[str] = None,
+            data_fim: Optional[str] = None,
+            limite: Optional[int] = None,
+            inicio: Optional[tuple[str, str, str]] = None
+    ) -> list[dict]:
+        """
+        Retorna os cardápios na ordem (data, campus, tipo_refeicao) que atendem aos filtros.
+        O período (datas ISO, inclusivas) é localizado por bisseção; inicio é a chave após a qual a página começa.
+        """
+        with self._lock:
+            chaves = self._chaves_ordenadas
+            primeira = bisect.bisect_left(chaves, (data_inicio,)) if data_inicio else 0
+            if inicio:
+                primeira = max(primeira, bisect.bisect_right(chaves, (*inicio, MAXIMO_CHAVE)))
+            ultima = bisect.bisect_right(chaves, (data_fim, MAXIMO_CHAVE)) if data_fim else len(chaves)
+
+            resultado = []
+            for posicao in range(primeira, ultima):
+                _, campus_chave, tipo_chave, id = chaves[posicao]
+                if campus and campus_chave not in campus:
+                    continue
+                if tipo_refeicao and tipo_chave not in tipo_refeicao:
+                    continue
+                cardapio = self._por_id[id]
+                if fornecedor and cardapio["fornecedor"] not in fornecedor:
+                    continue
+                resultado.append(cardapio)
+                if limite is not None and len(resultado) == limite:
+                    break
+            return resultado
@@ -0,0 +1,232 @@
+"""
+Métricas no formato do Prometheus, expostas em /metrics.
+
+- Latência e requisições em andamento por rota (MetricasMiddleware)
+- Leituras de documentos e viagens ao Firestore por rota, operação e coleção (FirestoreInstrumentado)
+- Acertos e falhas dos caches em memória, lidos dos contadores já mantidos por cada cache (ColetorCaches)
+
+A rota é guardada em uma ContextVar, que o anyio propaga para as threads de dados.py; chamadas
+feitas fora de requisições (tarefas periódicas e listeners) aparecem como "segundo_plano".
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+ROTA_FORA_DE_REQUISICAO = "segundo_plano"
+ROTA_NAO_ENCONTRADA = "nao_encontrada"
+
+rota_atual: ContextVar[str] = ContextVar("rota_atual", default=ROTA_FORA_DE_REQUISICAO)
+
+DURACAO_REQUISICOES = Histogram(
+    "resun_requisicao_duracao_segundos",
+    "Duração das requisições HTTP",
+    ("rota", "metodo", "status"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUISICOES_EM_ANDAMENTO = Gauge(
+    "resun_requisicoes_em_andamento",
+    "Requisições HTTP sendo atendidas",
+    ("rota",),
+)
+LEITURAS_FIRESTORE = Counter(
+    "resun_firestore_leituras",
+    "Documentos lidos do Firestore",
+    ("rota", "operacao", "colecao"),
+)
+CHAMADAS_FIRESTORE = Counter(
+    "resun_firestore_chamadas",
+    "Viagens de rede ao Firestore",
+    ("rota", "operacao", "colecao"),
+)
+
+
+def _registrar(operacao: str, colecao: str, leituras: int, chamadas: int = 1, rota: Optional[str] = None):
+    rota = rota or rota_atual.get()
+    if chamadas:
+        CHAMADAS_FIRESTORE.labels(rota, operacao, colecao).inc(chamadas)
+    if leituras:
+        LEITURAS_FIRESTORE.labels(rota, operacao, colecao).inc(leituras)
+
+
+class _DocumentoInstrumentado:
+    def __init__(self, referencia, colecao: str):
+        self._referencia = referencia
+        self._colecao = colecao
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._referencia, nome)
+
+    def get(self, *args, **kwargs):
+        snapshot = self._referencia.get(*args, **kwargs)
+        _registrar("get", self._colecao, 1)
+        return snapshot
+
+
+class _ConsultaInstrumentada:
+    """Envolve CollectionReference e Query; os métodos que montam a consulta devolvem outra consulta instrumentada."""
+
+    _ENCADEAVEIS = frozenset((
+        "where", "order_by", "limit", "limit_to_last", "offset", "select",
+        "start_at", "start_after", "end_at", "end_before",
+    ))
+
+    def __init__(self, consulta, colecao: str):
+        self._consulta = consulta
+        self._colecao = colecao
+
+    def __getattr__(self, nome: str) -> Any:
+        atributo = getattr(self._consulta, nome)
+        if nome in self._ENCADEAVEIS:
+            return lambda *args, **kwargs: _ConsultaInstrumentada(atributo(*args, **kwargs), self._colecao)
+        return atributo
+
+    def document(self, *args, **kwargs) -> _DocumentoInstrumentado:
+        return _DocumentoInstrumentado(self._consulta.document(*args, **kwargs), self._colecao)
+
+    def stream(self, *args, **kwargs):
+        leituras = 0
+        try:
+            for snapshot in self._consulta.stream(*args, **kwargs):
+                leituras += 1
+                yield snapshot
+        finally:
+            _registrar("stream", self._colecao, leituras)
+
+    def get(self, *args, **kwargs) -> list:
+        return list(self.stream(*args, **kwargs))
+
+    def on_snapshot(self, callback: Callable):
+        colecao = self._colecao
+
+        def callback_instrumentado(snapshots, mudancas, momento):
+            _registrar("on_snapshot", colecao, len(mudancas), rota=ROTA_FORA_DE_REQUISICAO)
+            return callback(snapshots, mudancas, momento)
+
+        return self._consulta.on_snapshot(callback_instrumentado)
+
+
+class FirestoreInstrumentado:
+    """Envolve o firestore.Client e conta as leituras e chamadas; o restante é repassado ao cliente."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self.db, nome)
+
+    def collection(self, *caminho: str) -> _ConsultaInstrumentada:
+        # Como em firestore.Client.collection, o caminho pode vir em partes ou separado por "/"
+        return _ConsultaInstrumentada(self.db.collection(*caminho), caminho[-1].rsplit("/", 1)[-1])
+
+    def get_all(self, references: Iterable, *args, **kwargs):
+        referencias = list(references)
+        colecao = referencias[0]._colecao if referencias and isinstance(referencias[0], _DocumentoInstrumentado) else ""
+        originais = [
+            referencia._referencia if isinstance(referencia, _DocumentoInstrumentado) else referencia
+            for referencia in referencias
+        ]
+        leituras = 0
+        try:
+            for snapshot in self.db.get_all(originais, *args, **kwargs):
+                leituras += 1
+                yield snapshot
+        finally:
+            _registrar("get_all", colecao, leituras)
+
+
+def instrumentar(db):
+    return db if isinstance(db, FirestoreInstrumentado) else FirestoreInstrumentado(db)
+
+
+class ColetorCaches:
+    """
+    Lê, a cada coleta, os contadores que o catálogo, os pacotes semanais, a coalescência das consultas
+    e o índice já mantêm, sem custo adicional nas requisições.
+    """
+
+    def __init__(self, state):
+        self.state = state
+
+    def collect(self):
+        acessos = CounterMetricFamily("resun_cache_acessos", "Acessos aos caches em memória", labels=("cache", "resultado"))
+        itens = GaugeMetricFamily("resun_cache_itens", "Itens guardados em cada cache", labels=("cache",))
+
+        catalogo = getattr(self.state, "catalogo", None)
+        if catalogo is not None:
+            acessos.add_metric(("catalogo_alimentos", "acerto"), catalogo.acertos)
+            acessos.add_metric(("catalogo_alimentos", "falha"), catalogo.falhas)
+            estatisticas = catalogo.estatisticas()
+            itens.add_metric(("catalogo_alimentos",), estatisticas["itens"])
+            itens.add_metric(("paginas_alimentos",), estatisticas["paginas"])
+
+        pacotes_semanais = getattr(self.state, "pacotes_semanais", None)
+        if pacotes_semanais is not None:
+            acessos.add_metric(("pacotes_semanais", "acerto"), pacotes_semanais.acertos)
+            acessos.add_metric(("pacotes_semanais", "falha"), pacotes_semanais.falhas)
+            itens.add_metric(("pacotes_semanais",), pacotes_semanais.quantidade)
+
+        consultas_cardapios = getattr(self.state, "consultas_cardapios", None)
+        if consultas_cardapios is not None:
+            acessos.add_metric(("consultas_cardapios", "acerto"), consultas_cardapios.acertos)
+            acessos.add_metric(("consultas_cardapios", "compartilhada"), consultas_cardapios.compartilhadas)
+            acessos.add_metric(("consultas_cardapios", "falha"), consultas_cardapios.execucoes)
+            itens.add_metric(("consultas_cardapios",), consultas_cardapios.quantidade)
+
+        indice = getattr(self.state, "indice", None)
+        if indice is not None:
+            itens.add_metric(("indice_cardapios",), indice.quantidade)
+            yield GaugeMetricFamily("resun_indice_pronto", "Índice em memória pronto para consultas", value=int(indice.pronto))
+
+        yield acessos
+        yield itens
+
+
+class MetricasMiddleware:
+    """Mede a duração e as requisições em andamento por rota, identificada pelo nome da função da rota."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @staticmethod
+    def _nome_da_rota(scope: Scope) -> str:
+        for rota in scope["app"].router.routes:
+            correspondencia, _ = rota.matches(scope)
+            if correspondencia == Match.FULL:
+                return rota.name
+        return ROTA_NAO_ENCONTRADA
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rota = self._nome_da_rota(scope)
+        token = rota_atual.set(rota)
+        em_andamento = REQUISICOES_EM_ANDAMENTO.labels(rota)
+        em_andamento.inc()
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem: Message):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            DURACAO_REQUISICOES.labels(rota, scope["method"], str(status)).observe(time.perf_counter() - inicio)
+            em_andamento.dec()
+            rota_atual.reset(token)
+
+
+def registrar_coletor_caches(state, registro: CollectorRegistry = REGISTRY) -> ColetorCaches:
+    coletor = ColetorCaches(state)
+    registro.register(coletor)
+    return coletor
@@ -53,6 +53,16 @@ class CardapioCompleto(Cardapio):
     """Modelo de resposta que inclui os objetos completos de Alimento."""
     id_alimentos: list[Alimento] = Field(description="Lista de objetos de alimentos servidos")
 
+    @classmethod
+    def a_partir_de(cls, cardapio: Cardapio, alimentos_map: dict[str, Alimento]) -> "CardapioCompleto":
+        """Substitui os IDs pelos alimentos do mapa, ignorando os IDs que não estão nele."""
+        alimentos = [alimentos_map[id] for id in cardapio.id_alimentos if id in alimentos_map]
+
+        cardapio_dict = cardapio.model_dump()
+        del cardapio_dict['id_alimentos']
+
+        return cls(**cardapio_dict, id_alimentos=alimentos)
+
     # Renomeando o campo para clareza na resposta da API
     class Config:
         fields = {
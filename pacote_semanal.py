@@ -0,0 +1,180 @@
+"""Pacotes pré-serializados com os cardápios de todos os campi em uma semana"""
+import asyncio
+import dataclasses
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import orjson
+from google.cloud import firestore
+
+from cache_http import calcular_etag
+from catalogo import CatalogoAlimentos
+from compressao import ConteudoComprimido
+from consultas import FiltrosCardapios, buscar_cardapios
+from dados import DOCUMENTO_VERSAO_CARDAPIOS, ler_versao
+from indice import IndiceCardapios
+from modelos import Campus
+from serializacao import serializar_objeto
+from snapshot import SnapshotCardapios
+
+_FORMATO_SEMANA = re.compile(r"^(\d{4})-W(\d{2})$")
+
+
+def periodo_da_semana(semana: str) -> tuple[date, date]:
+    """Converte uma semana ISO 8601 (AAAA-Www) para a segunda-feira e o domingo correspondentes."""
+    correspondencia = _FORMATO_SEMANA.match(semana)
+    if not correspondencia:
+        raise ValueError(f"Semana inválida: '{semana}'. Use o formato AAAA-Www, por exemplo 2025-W10.")
+    ano, numero = (int(parte) for parte in correspondencia.groups())
+    try:
+        segunda = date.fromisocalendar(ano, numero, 1)
+    except ValueError:
+        raise ValueError(f"Semana inválida: '{semana}'. O ano {ano} não tem a semana {numero}.")
+    return segunda, segunda + timedelta(days=6)
+
+
+def semana_da_data(dia: date) -> str:
+    ano, numero, _ = dia.isocalendar()
+    return f"{ano}-W{numero:02d}"
+
+
+@dataclasses.dataclass
+class PacoteSemanal:
+    semana: str
+    inicio: date
+    fim: date
+    conteudo: ConteudoComprimido
+    etag: str
+    ultima_modificacao: Optional[datetime]
+    criado_em: float
+
+
+class PacotesSemanais:
+    """
+    Guarda, por semana, o JSON pronto para envio com os cardápios de todos os campi
+    ({"campi": {campus: {data: {tipo_refeicao: cardápio}}}}), com as variantes gzip e brotli
+    geradas na construção. Os pacotes são descartados
+    quando o scraper altera a versão em metadados/cardapios, quando o catálogo de
+    alimentos muda de versão, quando o índice em memória recebe alterações ou quando o TTL expira.
+    """
+
+    def __init__(
+            self,
+            db: Optional[firestore.Client],
+            catalogo: CatalogoAlimentos,
+            usar_cardapios_completos: bool,
+            indice: Optional[IndiceCardapios | SnapshotCardapios] = None,
+            ttl_segundos: Optional[float] = None,
+            max_semanas: Optional[int] = None,
+            intervalo_atualizacao: Optional[float] = None,
+    ):
+        self.db = db
+        self.catalogo = catalogo
+        self.usar_cardapios_completos = usar_cardapios_completos
+        self.indice = indice
+        if ttl_segundos is None:
+            ttl_segundos = float(os.getenv("PACOTES_TTL_SEGUNDOS", 600))
+        if max_semanas is None:
+            max_semanas = int(os.getenv("PACOTES_MAX_SEMANAS", 16))
+        if intervalo_atualizacao is None:
+            intervalo_atualizacao = float(os.getenv("PACOTES_INTERVALO_ATUALIZACAO", 60))
+        self.ttl_segundos = ttl_segundos
+        self.max_semanas = max_semanas
+        self.intervalo_atualizacao = intervalo_atualizacao
+
+        self._pacotes: OrderedDict[str, PacoteSemanal] = OrderedDict()
+        self._construcoes: dict[str, asyncio.Future] = {}
+        # Incrementada a cada invalidação, para descartar pacotes construídos com dados antigos
+        self._geracao = 0
+        self.versao_cardapios: Optional[str] = None
+        self._versao_catalogo = catalogo.versao
+        self.acertos = 0
+        self.falhas = 0
+
+    @property
+    def quantidade(self) -> int:
+        return len(self._pacotes)
+
+    def invalidar(self):
+        self._geracao += 1
+        self._pacotes.clear()
+
+    async def executar_atualizacao_periodica(self):
+        self.versao_cardapios = await ler_versao(self.db, DOCUMENTO_VERSAO_CARDAPIOS)
+        while True:
+            await asyncio.sleep(self.intervalo_atualizacao)
+            try:
+                versao_cardapios = await ler_versao(self.db, DOCUMENTO_VERSAO_CARDAPIOS)
+                if versao_cardapios != self.versao_cardapios or self.catalogo.versao != self._versao_catalogo:
+                    self.versao_cardapios = versao_cardapios
+                    self._versao_catalogo = self.catalogo.versao
+                    self.invalidar()
+            except Exception as e:
+                print(f"Erro ao verificar a versão dos cardápios: {e}")
+
+    async def obter(self, semana: str) -> PacoteSemanal:
+        pacote = self._pacotes.get(semana)
+        if pacote is not None and time.monotonic() - pacote.criado_em <= self.ttl_segundos:
+            self._pacotes.move_to_end(semana)
+            self.acertos += 1
+            return pacote
+        self.falhas += 1
+
+        # Requisições simultâneas para a mesma semana aguardam uma única construção
+        construcao = self._construcoes.get(semana)
+        if construcao is None:
+            construcao = asyncio.ensure_future(self._construir(semana))
+            self._construcoes[semana] = construcao
+            construcao.add_done_callback(lambda _: self._construcoes.pop(semana, None))
+        return await asyncio.shield(construcao)
+
+    async def _construir(self, semana: str) -> PacoteSemanal:
+        geracao = self._geracao
+        inicio, fim = periodo_da_semana(semana)
+        resultado = await buscar_cardapios(
+            self.db,
+            self.catalogo,
+            self.usar_cardapios_completos,
+            FiltrosCardapios(data_inicio=inicio, data_fim=fim),
+            indice=self.indice
+        )
+
+        campi: dict[str, dict[str, dict[str, bytes]]] = {campus.value: {} for campus in Campus}
+        for cardapio, conteudo_cardapio in zip(resultado.cardapios, resultado.conteudos):
+            dia = campi[cardapio["campus"]].setdefault(cardapio["data"], {})
+            dia[cardapio["tipo_refeicao"]] = conteudo_cardapio
+
+        # Os cardápios já vêm serializados e são apenas encaixados no JSON do pacote
+        conteudo = serializar_objeto([
+            ("semana", orjson.dumps(semana)),
+            ("inicio", orjson.dumps(inicio.isoformat())),
+            ("fim", orjson.dumps(fim.isoformat())),
+            ("campi", serializar_objeto(
+                (campus, serializar_objeto(
+                    (dia, serializar_objeto(refeicoes.items())) for dia, refeicoes in dias.items()
+                ))
+                for campus, dias in campi.items()
+            )),
+        ])
+        pacote = PacoteSemanal(
+            semana=semana,
+            inicio=inicio,
+            fim=fim,
+            conteudo=await asyncio.to_thread(ConteudoComprimido(conteudo).preparar),
+            etag=calcular_etag(conteudo),
+            ultima_modificacao=resultado.ultima_modificacao,
+            criado_em=time.monotonic()
+        )
+
+        if geracao != self._geracao:
+            return pacote
+
+        self._pacotes[semana] = pacote
+        self._pacotes.move_to_end(semana)
+        while len(self._pacotes) > self.max_semanas:
+            self._pacotes.popitem(last=False)
+        return pacote
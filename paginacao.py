@@ -0,0 +1,46 @@
+"""Paginação por cursor opaco para as rotas de listagem"""
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+# Ordem total das listagens de cardápios; o cursor guarda esses campos do último item da página
+ORDEM_CARDAPIOS = ("data", "campus", "tipo_refeicao")
+ORDEM_ALIMENTOS = ("id",)
+# Maior que qualquer campus, tipo de refeição ou ID, para montar limites superiores na bisseção das chaves
+MAXIMO_CHAVE = "\uffff"
+
+
+def codificar_cursor(valores: dict) -> str:
+    conteudo = json.dumps(valores, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(conteudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, campos: tuple[str, ...]) -> dict:
+    try:
+        conteudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(conteudo)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    if not isinstance(valores, dict) or set(valores) != set(campos):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return valores
+
+
+def cursor_do_item(item: dict, campos: tuple[str, ...]) -> str:
+    return codificar_cursor({campo: item[campo] for campo in campos})
+
+
+def chave_de_ordenacao(item: dict, campos: tuple[str, ...]) -> tuple:
+    return tuple(item[campo] for campo in campos)
+
+
+def adicionar_cabecalhos_paginacao(response: Response, request: Request, proximo_cursor: Optional[str]):
+    """Informa o cursor da próxima página em X-Next-Cursor e no cabeçalho Link (rel="next")."""
+    if proximo_cursor is None:
+        return
+    response.headers["X-Next-Cursor"] = proximo_cursor
+    response.headers["Link"] = f'<{request.url.include_query_params(cursor=proximo_cursor)}>; rel="next"'
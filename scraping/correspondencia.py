@@ -0,0 +1,143 @@
+"""
+Correspondência entre os textos das células das planilhas e os IDs dos alimentos.
+
+Os mapeamentos de todos os campi são compilados uma única vez em um índice de textos normalizados
+(sem acentos, pontuação e diferenças de maiúsculas e espaços) e de trigramas. A busca tenta, em ordem:
+  1. o texto exato no mapeamento do campus (como antes)
+  2. o texto normalizado em qualquer mapeamento
+  3. o texto mais parecido por distância de edição, entre os candidatos que compartilham trigramas,
+     aceito apenas com similaridade de pelo menos LIMIAR_CONFIANCA e sem empate com outro alimento
+Os resultados por texto ficam em cache, já que as mesmas células se repetem entre semanas e campi.
+"""
+import dataclasses
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Optional
+
+# Similaridade mínima (1 - distância de edição / tamanho do maior texto) para aceitar uma correspondência aproximada
+LIMIAR_CONFIANCA = 0.85
+# Diferença mínima de similaridade entre o melhor candidato e o melhor de outro alimento
+MARGEM_AMBIGUIDADE = 0.05
+# Textos normalizados menores que isso só são aceitos por correspondência exata
+TAMANHO_MINIMO_APROXIMADO = 6
+# Candidatos, entre os que mais compartilham trigramas, comparados por distância de edição
+MAXIMO_CANDIDATOS = 12
+
+METODO_EXATO = "exato"
+METODO_NORMALIZADO = "normalizado"
+METODO_APROXIMADO = "aproximado"
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9A-Z]+")
+
+
+def normalizar(texto: str) -> str:
+    """'Hamburguér de soja c/ molho' -> 'HAMBURGUER DE SOJA C MOLHO'"""
+    sem_acentos = "".join(
+        caractere for caractere in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(caractere)
+    )
+    return _NAO_ALFANUMERICO.sub(" ", sem_acentos.upper()).strip()
+
+
+def trigramas(texto: str) -> set[str]:
+    texto = f"  {texto} "
+    return {texto[posicao:posicao + 3] for posicao in range(len(texto) - 2)}
+
+
+def distancia_edicao(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, caractere_a in enumerate(a, 1):
+        atual = [i]
+        for j, caractere_b in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (caractere_a != caractere_b)))
+        anterior = atual
+    return anterior[-1]
+
+
+def similaridade(a: str, b: str) -> float:
+    maior = max(len(a), len(b))
+    return 1.0 if maior == 0 else 1 - distancia_edicao(a, b) / maior
+
+
+@dataclasses.dataclass(frozen=True)
+class Correspondencia:
+    # None quando nenhum alimento atingiu o limiar; candidato e confianca indicam o mais próximo
+    id_alimento: Optional[str]
+    metodo: Optional[str]
+    confianca: float
+    candidato: Optional[str] = None
+
+
+class CorrespondenciaAlimentos:
+    def __init__(self, mapas: Iterable[dict[str, str]]):
+        self._ids_por_normalizado: dict[str, set[str]] = {}
+        for mapa in mapas:
+            for texto, id_alimento in mapa.items():
+                self._ids_por_normalizado.setdefault(normalizar(texto), set()).add(id_alimento)
+
+        self._normalizados = list(self._ids_por_normalizado)
+        self._indice_trigramas: dict[str, list[int]] = {}
+        for posicao, normalizado in enumerate(self._normalizados):
+            for trigrama in trigramas(normalizado):
+                self._indice_trigramas.setdefault(trigrama, []).append(posicao)
+        self._cache: dict[tuple[str, frozenset[str]], Correspondencia] = {}
+
+    @staticmethod
+    def _escolher(ids: set[str], preferidos: frozenset[str]) -> Optional[str]:
+        """Um único ID, ou o único entre eles que pertence ao mapeamento do campus."""
+        if len(ids) == 1:
+            return next(iter(ids))
+        do_campus = ids & preferidos
+        return next(iter(do_campus)) if len(do_campus) == 1 else None
+
+    def corresponder(self, texto: str, id_alimentos_mapa: dict[str, str]) -> Correspondencia:
+        """texto já com os espaços e quebras de linha colapsados; id_alimentos_mapa é o do campus da planilha."""
+        id_alimento = id_alimentos_mapa.get(texto)
+        if id_alimento is not None:
+            return Correspondencia(id_alimento, METODO_EXATO, 1.0, texto)
+
+        preferidos = frozenset(id_alimentos_mapa.values())
+        normalizado = normalizar(texto)
+        chave = (normalizado, preferidos)
+        correspondencia = self._cache.get(chave)
+        if correspondencia is None:
+            correspondencia = self._cache[chave] = self._buscar(normalizado, preferidos)
+        return correspondencia
+
+    def _buscar(self, normalizado: str, preferidos: frozenset[str]) -> Correspondencia:
+        ids = self._ids_por_normalizado.get(normalizado)
+        if ids is not None:
+            id_alimento = self._escolher(ids, preferidos)
+            if id_alimento is not None:
+                return Correspondencia(id_alimento, METODO_NORMALIZADO, 1.0, normalizado)
+
+        comuns = Counter(
+            posicao for trigrama in trigramas(normalizado) for posicao in self._indice_trigramas.get(trigrama, ())
+        )
+        candidatos = sorted(
+            (
+                (similaridade(normalizado, self._normalizados[posicao]), self._normalizados[posicao])
+                for posicao, _ in comuns.most_common(MAXIMO_CANDIDATOS)
+            ),
+            reverse=True
+        )
+        if not candidatos:
+            return Correspondencia(None, None, 0.0)
+
+        confianca, candidato = candidatos[0]
+        id_alimento = self._escolher(self._ids_por_normalizado[candidato], preferidos)
+        outros = [
+            outra_confianca for outra_confianca, outro in candidatos[1:]
+            if self._ids_por_normalizado[outro] != self._ids_por_normalizado[candidato]
+        ]
+        aceito = (
+            id_alimento is not None
+            and len(normalizado) >= TAMANHO_MINIMO_APROXIMADO
+            and confianca >= LIMIAR_CONFIANCA
+            and (not outros or confianca - outros[0] >= MARGEM_AMBIGUIDADE)
+        )
+        if not aceito:
+            return Correspondencia(None, None, confianca, candidato)
+        return Correspondencia(id_alimento, METODO_APROXIMADO, confianca, candidato)
@@ -0,0 +1,192 @@
+"""
+Medição das etapas do scraper, por campus: tempo, chamadas às APIs e bytes transferidos.
+
+As etapas são delimitadas com RelatorioExecucao.medir. As chamadas ao Google Sheets são contadas
+por um hook na sessão HTTP do gspread (corpo das respostas, status 429 como cota excedida); as ao
+Firestore são registradas por mandar_para_firestore.py com registrar_chamada, com os bytes estimados
+pelo tamanho em JSON dos documentos lidos e gravados. A etapa em andamento fica em uma ContextVar,
+de modo que cada thread de extrair_todos_cardapios atribui as chamadas ao próprio campus.
+"""
+import cProfile
+import dataclasses
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+ETAPA_OBTER_SHEET = "obter_sheet"
+ETAPA_LEITURA_CELULAS = "leitura_celulas"
+ETAPA_IMPRESSAO_DIGITAL = "impressao_digital"
+ETAPA_DETECCAO_LAYOUT = "detectar_layout"
+ETAPA_EXTRACAO = "extrair_cardapios"
+ETAPA_METADADOS = "metadados"
+ETAPA_UPLOAD_CARDAPIOS = "upload_cardapios"
+ETAPA_UPLOAD_CARDAPIOS_COMPLETOS = "upload_cardapios_completos"
+ETAPA_SNAPSHOT = "snapshot"
+
+# Etapas que atendem todos os campi de uma vez, como o upload em lote dos cardápios
+TODOS_CAMPI = "todos"
+
+STATUS_COTA_EXCEDIDA = 429
+
+
+@dataclasses.dataclass
+class MedidaEtapa:
+    segundos: float = 0.0
+    chamadas: int = 0
+    bytes: int = 0
+    erros_http: int = 0
+    cota_excedida: int = 0
+
+    def registrar_chamada(self, bytes_transferidos: int = 0, status: int = 200):
+        self.chamadas += 1
+        self.bytes += bytes_transferidos
+        if status >= 400:
+            self.erros_http += 1
+        if status == STATUS_COTA_EXCEDIDA:
+            self.cota_excedida += 1
+
+    def somar(self, outra: "MedidaEtapa"):
+        for campo in dataclasses.fields(self):
+            setattr(self, campo.name, getattr(self, campo.name) + getattr(outra, campo.name))
+
+
+_medida_atual: ContextVar[Optional[MedidaEtapa]] = ContextVar("medida_atual", default=None)
+
+
+def registrar_chamada(bytes_transferidos: int = 0, status: int = 200):
+    """Atribui uma chamada à etapa em andamento na thread atual; fora de uma etapa, não faz nada."""
+    medida = _medida_atual.get()
+    if medida is not None:
+        medida.registrar_chamada(bytes_transferidos, status)
+
+
+def tamanho_documentos(documentos: Iterable[dict]) -> int:
+    """Estimativa dos bytes transferidos ao Firestore: tamanho dos documentos em JSON."""
+    return sum(len(json.dumps(documento, ensure_ascii=False, default=str).encode("utf-8")) for documento in documentos)
+
+
+def _contar_resposta(response, *args, **kwargs):
+    registrar_chamada(len(response.content), response.status_code)
+
+
+class RelatorioExecucao:
+    """
+    Medidas de uma execução do scraper, agrupadas por campus e etapa, gravadas em JSON com salvar.
+    Com perfilar=True, as funções passadas a executar rodam sob o cProfile (um perfil por chamada,
+    já que o cProfile só observa a thread em que foi ativado), e salvar_perfil junta todos em um arquivo pstats.
+    """
+
+    def __init__(self, perfilar: bool = False):
+        self.iniciado_em = datetime.now()
+        self._inicio = time.perf_counter()
+        self.duracao_segundos: Optional[float] = None
+        self.medidas: dict[str, dict[str, MedidaEtapa]] = {}
+        self.falhas: dict[str, str] = {}
+        self.celulas_nao_exatas: dict[str, list[dict]] = {}
+        self.divergencias_layout: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self._perfis: Optional[list[cProfile.Profile]] = [] if perfilar else None
+
+    def medida(self, campus: str, etapa: str) -> MedidaEtapa:
+        with self._lock:
+            return self.medidas.setdefault(campus, {}).setdefault(etapa, MedidaEtapa())
+
+    @contextmanager
+    def medir(self, campus: str, etapa: str) -> Iterator[MedidaEtapa]:
+        medida = self.medida(campus, etapa)
+        token = _medida_atual.set(medida)
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        finally:
+            medida.segundos += time.perf_counter() - inicio
+            _medida_atual.reset(token)
+
+    def registrar_falha(self, campus: str, erro: Exception):
+        with self._lock:
+            self.falhas[campus] = f"{type(erro).__name__}: {erro}"
+
+    def registrar_celulas_nao_exatas(self, campus: str, celulas: list[dict]):
+        with self._lock:
+            self.celulas_nao_exatas[campus] = celulas
+
+    def registrar_divergencias_layout(self, campus: str, divergencias: list[str]):
+        with self._lock:
+            self.divergencias_layout[campus] = divergencias
+
+    @staticmethod
+    def instrumentar_client(client) -> bool:
+        """Conta as respostas da sessão HTTP do gspread.Client; retorna False se o cliente não tiver uma."""
+        sessao = getattr(getattr(client, "http_client", None), "session", None)
+        if sessao is None:
+            return False
+        hooks = sessao.hooks.setdefault("response", [])
+        if _contar_resposta not in hooks:
+            hooks.append(_contar_resposta)
+        return True
+
+    def executar(self, funcao: Callable[..., T], *args, **kwargs) -> T:
+        if self._perfis is None:
+            return funcao(*args, **kwargs)
+        perfil = cProfile.Profile()
+        try:
+            return perfil.runcall(funcao, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._perfis.append(perfil)
+
+    def finalizar(self):
+        self.duracao_segundos = time.perf_counter() - self._inicio
+
+    def totais_por_etapa(self) -> dict[str, MedidaEtapa]:
+        totais: dict[str, MedidaEtapa] = {}
+        for etapas in self.medidas.values():
+            for etapa, medida in etapas.items():
+                totais.setdefault(etapa, MedidaEtapa()).somar(medida)
+        return totais
+
+    def para_dict(self) -> dict:
+        def formatar(medida: MedidaEtapa) -> dict:
+            return {**dataclasses.asdict(medida), "segundos": round(medida.segundos, 4)}
+
+        return {
+            "iniciado_em": self.iniciado_em.isoformat(timespec="seconds"),
+            "duracao_segundos": None if self.duracao_segundos is None else round(self.duracao_segundos, 4),
+            "campi": {
+                campus: {etapa: formatar(medida) for etapa, medida in etapas.items()}
+                for campus, etapas in self.medidas.items()
+            },
+            "totais_por_etapa": {etapa: formatar(medida) for etapa, medida in self.totais_por_etapa().items()},
+            "falhas": self.falhas,
+            "celulas_nao_exatas": self.celulas_nao_exatas,
+            "divergencias_layout": self.divergencias_layout,
+        }
+
+    def salvar(self, caminho: Path):
+        caminho.write_text(json.dumps(self.para_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def salvar_perfil(self, caminho: Path):
+        if not self._perfis:
+            return
+        estatisticas = pstats.Stats(self._perfis[0])
+        for perfil in self._perfis[1:]:
+            estatisticas.add(perfil)
+        estatisticas.dump_stats(caminho)
+
+    def resumo(self) -> str:
+        linhas = [f"{'campus':<16}{'etapa':<28}{'segundos':>10}{'chamadas':>10}{'bytes':>12}{'erros':>7}"]
+        for campus, etapas in self.medidas.items():
+            for etapa, medida in etapas.items():
+                linhas.append(
+                    f"{campus:<16}{etapa:<28}{medida.segundos:>10.3f}{medida.chamadas:>10}"
+                    f"{medida.bytes:>12}{medida.erros_http:>7}"
+                )
+        return "\n".join(linhas)
@@ -0,0 +1,107 @@
+"""
+Detecção da disposição dos cardápios na planilha a partir dos marcadores de dia da semana
+(SEGUNDA-FEIRA, TERÇA, ...) e de refeição (ALMOÇO, JANTAR), em qualquer coluna da grade lida.
+
+Cada linha com marcador abre um bloco, que vai até a linha anterior ao próximo marcador (o último,
+até LINHAS_VAZIAS_FIM_BLOCO linhas vazias seguidas na coluna de itens, para não incluir notas de
+rodapé como "Cardápio sujeito a alterações"); o dia
+de um marcador de refeição é o do último marcador de dia acima dele, e um marcador de dia sem
+refeição própria abre um bloco sem tipo (resolvido pelo layout esperado). Os alimentos do bloco
+são as células da coluna de itens nesse intervalo que não são, elas mesmas, marcadores.
+
+A detecção só roda para planilhas cuja impressão digital mudou (ver _extrair_se_alterado), e cada
+célula passa antes por um teste barato de prefixo, de modo que só as candidatas são normalizadas.
+"""
+import dataclasses
+from typing import Optional
+
+from modelos import TipoRefeicao
+from scraping.correspondencia import normalizar
+
+# Na ordem de DiaSemana
+DIAS = ("SEGUNDA", "TERCA", "QUARTA", "QUINTA", "SEXTA", "SABADO", "DOMINGO")
+REFEICOES = {"ALMOCO": TipoRefeicao.ALMOCO, "JANTAR": TipoRefeicao.JANTAR}
+# Primeiras letras (em maiúsculas, antes de remover os acentos) que um marcador pode ter
+_PREFIXOS = frozenset(("SEG", "TER", "QUA", "QUI", "SEX", "SAB", "SÁB", "DOM", "ALM", "JAN"))
+
+LINHAS_VAZIAS_FIM_BLOCO = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class Bloco:
+    dia_semana: int
+    # None quando o dia não tem marcador de refeição próprio
+    tipo_refeicao: Optional[TipoRefeicao]
+    # Linhas da coluna de itens, excluindo as que contêm marcadores
+    linhas: tuple[int, ...]
+
+
+def _candidato(texto: str) -> bool:
+    return texto.lstrip()[:3].upper() in _PREFIXOS
+
+
+def identificar_marcador(texto: str) -> Optional[tuple[Optional[int], Optional[TipoRefeicao]]]:
+    """(dia, tipo de refeição) indicados pelo texto, ou None se ele não for um marcador."""
+    if not _candidato(texto):
+        return None
+    palavras = normalizar(texto).split()
+    if not palavras:
+        return None
+
+    tipo_refeicao = next((REFEICOES[palavra] for palavra in palavras if palavra in REFEICOES), None)
+    if palavras[0] in DIAS:
+        return DIAS.index(palavras[0]), tipo_refeicao
+    if palavras[0] in REFEICOES:
+        return None, tipo_refeicao
+    return None
+
+
+def _fim_ultimo_bloco(valores: dict[tuple[int, int], str], coluna_itens: int, inicio: int, ultima_linha: int) -> int:
+    """Primeira linha da primeira sequência de LINHAS_VAZIAS_FIM_BLOCO itens vazios após um preenchido."""
+    preenchido = False
+    vazias = 0
+    for linha in range(inicio, ultima_linha + 1):
+        if valores.get((linha, coluna_itens), "").strip():
+            preenchido = True
+            vazias = 0
+        elif preenchido:
+            vazias += 1
+            if vazias == LINHAS_VAZIAS_FIM_BLOCO:
+                return linha - vazias + 1
+    return ultima_linha + 1
+
+
+def detectar_blocos(valores: dict[tuple[int, int], str], coluna_itens: int, ultima_linha: int) -> list[Bloco]:
+    por_linha: dict[int, tuple[Optional[int], Optional[TipoRefeicao]]] = {}
+    for (row, _), texto in valores.items():
+        if not texto:
+            continue
+        marcador = identificar_marcador(texto)
+        if marcador is None:
+            continue
+        dia, tipo_refeicao = por_linha.get(row, (None, None))
+        por_linha[row] = (marcador[0] if marcador[0] is not None else dia, marcador[1] or tipo_refeicao)
+
+    linhas_marcadores = sorted(por_linha)
+    blocos = []
+    dia_atual = None
+    for posicao, row in enumerate(linhas_marcadores):
+        dia, tipo_refeicao = por_linha[row]
+        if dia is not None:
+            dia_atual = dia
+        if dia_atual is None:
+            continue
+
+        if posicao + 1 < len(linhas_marcadores):
+            fim = linhas_marcadores[posicao + 1]
+        else:
+            fim = _fim_ultimo_bloco(valores, coluna_itens, row, ultima_linha)
+        linhas = tuple(
+            linha for linha in range(row, fim)
+            if identificar_marcador(valores.get((linha, coluna_itens), "")) is None
+        )
+        # Um marcador de dia seguido diretamente por marcadores de refeição não forma bloco próprio
+        if tipo_refeicao is None and not any(valores.get((linha, coluna_itens), "").strip() for linha in linhas):
+            continue
+        blocos.append(Bloco(dia_atual, tipo_refeicao, linhas))
+    return blocos
@@ -1,28 +1,366 @@
+import argparse
+import dataclasses
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from google.api_core import exceptions as google_exceptions
+from google.cloud import firestore
+
 from auth import get_firestore_client
-from scraping.planilhas import obter_todos_cardapios_dessa_semana
+from dados import (
+    COLECAO_CARDAPIOS_COMPLETOS,
+    COLECAO_METADADOS,
+    DOCUMENTO_MATERIALIZACAO,
+    DOCUMENTO_VERSAO_ALIMENTOS,
+    DOCUMENTO_VERSAO_CARDAPIOS,
+    TAMANHO_LOTE_GET_ALL,
+)
+from modelos import Alimento, Cardapio, CardapioCompleto
+from scraping.instrumentacao import (
+    ETAPA_METADADOS,
+    ETAPA_SNAPSHOT,
+    ETAPA_UPLOAD_CARDAPIOS,
+    ETAPA_UPLOAD_CARDAPIOS_COMPLETOS,
+    TODOS_CAMPI,
+    RelatorioExecucao,
+    registrar_chamada,
+    tamanho_documentos,
+)
+from scraping.planilhas import extrair_todos_cardapios
+from snapshot import escrever_snapshot
+
+# Impressões digitais das planilhas (ver extrair_todos_cardapios); usado apenas pelo scraper
+DOCUMENTO_IMPRESSOES_PLANILHAS = "planilhas"
+
+# Limite de operações por WriteBatch imposto pelo Firestore
+TAMANHO_MAXIMO_LOTE = 500
+TENTATIVAS_MAXIMAS = 5
+ERROS_TRANSITORIOS = (
+    google_exceptions.Aborted,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+)
+
+
+@dataclasses.dataclass
+class ResumoUpload:
+    criados: int = 0
+    atualizados: int = 0
+    ignorados: int = 0
+
+    @property
+    def alterados(self) -> int:
+        return self.criados + self.atualizados
+
+    def __str__(self):
+        return f"{self.criados} criados, {self.atualizados} atualizados, {self.ignorados} sem alteração"
+
+
+def _commit_com_retentativa(lote: firestore.WriteBatch, bytes_enviados: int = 0):
+    for tentativa in range(1, TENTATIVAS_MAXIMAS + 1):
+        try:
+            resposta = lote.commit()
+            registrar_chamada(bytes_enviados)
+            return resposta
+        except ERROS_TRANSITORIOS as e:
+            registrar_chamada(bytes_enviados, int(e.code or 500))
+            if tentativa == TENTATIVAS_MAXIMAS:
+                raise
+            espera = 2 ** (tentativa - 1)
+            print(f" -> Falha transitória no commit ({e}). Nova tentativa em {espera}s...")
+            time.sleep(espera)
+
+
+def enviar_documentos(db: firestore.Client, colecao: str, documentos: dict[str, dict]) -> ResumoUpload:
+    """
+    Envia para a coleção apenas os documentos novos ou alterados.
+    Os documentos atuais são lidos com get_all em lotes e as escritas são agrupadas em WriteBatch.
+    """
+    resumo = ResumoUpload()
+    if not documentos:
+        return resumo
+
+    collection_ref = db.collection(colecao)
+    refs = {doc_id: collection_ref.document(doc_id) for doc_id in documentos}
+    lista_refs = list(refs.values())
+    existentes = {}
+    for inicio in range(0, len(lista_refs), TAMANHO_LOTE_GET_ALL):
+        lidos = {doc.id: doc.to_dict() for doc in db.get_all(lista_refs[inicio:inicio + TAMANHO_LOTE_GET_ALL]) if doc.exists}
+        registrar_chamada(tamanho_documentos(lidos.values()))
+        existentes.update(lidos)
+
+    escritas = []
+    for doc_id, dados in documentos.items():
+        atual = existentes.get(doc_id)
+        if atual == dados:
+            resumo.ignorados += 1
+            continue
+
+        if atual is None:
+            resumo.criados += 1
+        else:
+            resumo.atualizados += 1
+        escritas.append((refs[doc_id], dados))
+
+    for inicio in range(0, len(escritas), TAMANHO_MAXIMO_LOTE):
+        lote = db.batch()
+        escritas_lote = escritas[inicio:inicio + TAMANHO_MAXIMO_LOTE]
+        for ref, dados in escritas_lote:
+            lote.set(ref, dados)
+        _commit_com_retentativa(lote, tamanho_documentos(dados for _, dados in escritas_lote))
+
+    return resumo
+
+
+def _ler_metadados(db: firestore.Client, documento: str) -> dict:
+    doc = db.collection(COLECAO_METADADOS).document(documento).get()
+    dados = (doc.to_dict() or {}) if doc.exists else {}
+    registrar_chamada(tamanho_documentos([dados]))
+    return dados
+
+
+def _salvar_metadados(db: firestore.Client, documento: str, dados: dict):
+    if dados:
+        db.collection(COLECAO_METADADOS).document(documento).set(dados, merge=True)
+        registrar_chamada(tamanho_documentos([dados]))
+
+
+def _buscar_alimentos(db: firestore.Client, ids: set[str]) -> dict[str, Alimento]:
+    ids_ordenados = sorted(ids)
+    alimentos_map = {}
+    for inicio in range(0, len(ids_ordenados), TAMANHO_LOTE_GET_ALL):
+        refs = [db.collection("alimentos").document(id) for id in ids_ordenados[inicio:inicio + TAMANHO_LOTE_GET_ALL]]
+        lidos = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+        registrar_chamada(tamanho_documentos(lidos.values()))
+        for id, dados in lidos.items():
+            alimentos_map[id] = Alimento(**dados)
+    return alimentos_map
+
+
+def materializar_cardapios_completos(db: firestore.Client, cardapios: list[Cardapio]) -> ResumoUpload:
+    """Grava em cardapios_completos os cardápios informados, com os alimentos embutidos."""
+    alimentos_map = _buscar_alimentos(db, {id for cardapio in cardapios for id in cardapio.id_alimentos})
+    documentos = {
+        cardapio.id: CardapioCompleto.a_partir_de(cardapio, alimentos_map).model_dump(mode="json")
+        for cardapio in cardapios
+    }
+    return enviar_documentos(db, COLECAO_CARDAPIOS_COMPLETOS, documentos)
 
 
-def fazer_upload_cardapios():
+def _contar_alimentos(db: firestore.Client) -> int:
+    resultado = db.collection("alimentos").count().get()
+    registrar_chamada()
+    return int(resultado[0][0].value)
+
+
+def ler_versao_alimentos(db: firestore.Client, forcar: bool = False) -> str | None:
+    """
+    Versão da coleção de alimentos derivada dos próprios documentos (a quantidade e o maior update_time),
+    publicada em metadados/alimentos para o catálogo da API. Muda a cada inclusão, edição ou remoção,
+    inclusive as feitas fora deste código (pelo console do Firestore).
+
+    Ler a coleção inteira a cada execução de hora em hora seria uma leitura por alimento, então a
+    versão publicada é reaproveitada enquanto a contagem (agregação count, uma leitura a cada mil
+    documentos) não muda e a última verificação completa tem menos de SCRAPER_VERIFICACAO_ALIMENTOS_HORAS
+    horas (24, por padrão). Uma edição sem inclusão nem remoção aparece, portanto, em até um dia, ou
+    imediatamente com forcar (--forcar).
+    """
+    publicada = _ler_metadados(db, DOCUMENTO_VERSAO_ALIMENTOS)
+    verificado_em = publicada.get("verificado_em")
+    intervalo = timedelta(hours=float(os.getenv("SCRAPER_VERIFICACAO_ALIMENTOS_HORAS", 24)))
+    if (
+            not forcar
+            and publicada.get("versao") is not None
+            and verificado_em is not None
+            and datetime.now(timezone.utc) - verificado_em < intervalo
+            and publicada.get("quantidade") == _contar_alimentos(db)
+    ):
+        return publicada["versao"]
+
+    docs = list(db.collection("alimentos").stream())
+    registrar_chamada(tamanho_documentos(doc.to_dict() for doc in docs))
+    atualizado_em = max((doc.update_time for doc in docs if doc.update_time), default=None)
+    versao = None if atualizado_em is None else f"{len(docs)}:{atualizado_em.isoformat()}"
+    # O catálogo da API só compara o campo versao, então a nova data de verificação não o faz recarregar
+    _salvar_metadados(
+        db,
+        DOCUMENTO_VERSAO_ALIMENTOS,
+        {"versao": versao, "quantidade": len(docs), "verificado_em": datetime.now(timezone.utc)}
+    )
+    return versao
+
+
+def rematerializar_historico(db: firestore.Client, versao_alimentos: str | None = None) -> ResumoUpload:
+    """
+    Reconstrói cardapios_completos a partir de todos os cardápios, regravando apenas os que mudaram.
+    Necessário na primeira execução e sempre que a versão dos alimentos muda.
+    """
+    if versao_alimentos is None:
+        versao_alimentos = ler_versao_alimentos(db)
+    documentos = [doc.to_dict() for doc in db.collection("cardapios").stream()]
+    registrar_chamada(tamanho_documentos(documentos))
+    cardapios = [Cardapio(**dados) for dados in documentos]
+    resumo = materializar_cardapios_completos(db, cardapios)
+
+    # Avisa à API que a coleção cobre todo o histórico e pode substituir a junção com alimentos
+    _salvar_metadados(db, DOCUMENTO_MATERIALIZACAO, {"completo": True, "versao_alimentos": versao_alimentos})
+    return resumo
+
+
+def _atualizar_cardapios_completos(
+        db: firestore.Client,
+        cardapios: list[Cardapio],
+        forcar: bool,
+        versao_alimentos: str | None
+) -> ResumoUpload | None:
+    materializacao = _ler_metadados(db, DOCUMENTO_MATERIALIZACAO)
+
+    if forcar or not materializacao.get("completo") or materializacao.get("versao_alimentos") != versao_alimentos:
+        print("Reconstruindo cardápios completos de todo o histórico...")
+        return rematerializar_historico(db, versao_alimentos)
+    if cardapios:
+        return materializar_cardapios_completos(db, cardapios)
+    return None
+
+
+def gravar_snapshot(db: firestore.Client, caminho: Path) -> int:
+    """Lê todos os cardápios e alimentos e grava o snapshot usado pelo modo snapshot da API (ver snapshot.py)."""
+    cardapios = [doc.to_dict() for doc in db.collection("cardapios").stream()]
+    registrar_chamada(tamanho_documentos(cardapios))
+    alimentos = [doc.to_dict() for doc in db.collection("alimentos").stream()]
+    registrar_chamada(tamanho_documentos(alimentos))
+    return escrever_snapshot(caminho, cardapios, alimentos)
+
+
+def fazer_upload_cardapios(
+        forcar: bool = False,
+        relatorio: RelatorioExecucao | None = None,
+        caminho_snapshot: Path | None = None
+):
+    """
+    Extrai e envia os cardápios da semana. Retorna False se algum campus falhou na extração.
+    Campi cuja planilha não mudou desde a última execução são ignorados, a menos que forcar=True.
+    Em seguida, atualiza a coleção cardapios_completos (reconstruída por inteiro quando a versão
+    derivada dos alimentos muda), publica essa versão para o catálogo da API e, com caminho_snapshot,
+    grava o snapshot da API quando algo mudou ou quando o arquivo ainda não existe.
+    As etapas da extração são medidas por campus em relatorio; as do Firestore, que atendem
+    todos os campi em lote, aparecem sob TODOS_CAMPI.
+    """
+    if relatorio is None:
+        relatorio = RelatorioExecucao()
+    db = get_firestore_client()
+    with relatorio.medir(TODOS_CAMPI, ETAPA_METADADOS):
+        impressoes_anteriores = {} if forcar else _ler_metadados(db, DOCUMENTO_IMPRESSOES_PLANILHAS)
+
     print("Iniciando extração dos cardápios...")
-    lista_cardapios = obter_todos_cardapios_dessa_semana()
+    resultado = extrair_todos_cardapios(impressoes_anteriores=impressoes_anteriores, relatorio=relatorio)
+    lista_cardapios = resultado.cardapios
+
+    if resultado.inalterados:
+        campi = ", ".join(campus.value for campus in resultado.inalterados)
+        print(f"Planilhas sem alteração desde a última execução: {campi}")
+
+    for campus, divergencias in resultado.divergencias_layout.items():
+        for divergencia in divergencias:
+            print(f"Atenção: layout da planilha do campus '{campus.value}' difere da configuração: {divergencia}")
 
-    if not lista_cardapios:
+    # Textos não mapeados fazem o campus falhar (ver extrair_todos_cardapios) e aparecem em resultado.falhas
+    for campus, celulas in resultado.celulas_nao_exatas.items():
+        for celula in celulas:
+            print(
+                f"Texto mapeado por aproximação no campus '{campus.value}' (linha={celula.row}, coluna={celula.col}): "
+                f"'{celula.texto}' -> {celula.id_alimento} (similaridade {celula.confianca})"
+            )
+
+    alterados = 0
+    if lista_cardapios:
+        print(f"Iniciando upload de {len(lista_cardapios)} cardápios para o Firestore...")
+
+        documentos = {cardapio.id: cardapio.model_dump(mode="json") for cardapio in lista_cardapios}
+        with relatorio.medir(TODOS_CAMPI, ETAPA_UPLOAD_CARDAPIOS):
+            resumo = enviar_documentos(db, "cardapios", documentos)
+        alterados += resumo.alterados
+
+        print(f"\nUpload concluído! Cardápios: {resumo}")
+    elif not resultado.inalterados:
         print("Nenhum cardápio foi extraído.")
-        return
 
-    db = get_firestore_client()
-    collection_ref = db.collection("cardapios")
+    with relatorio.medir(TODOS_CAMPI, ETAPA_METADADOS):
+        versao_alimentos = ler_versao_alimentos(db, forcar)
+    with relatorio.medir(TODOS_CAMPI, ETAPA_UPLOAD_CARDAPIOS_COMPLETOS):
+        resumo_completos = _atualizar_cardapios_completos(db, lista_cardapios, forcar, versao_alimentos)
+    if resumo_completos is not None:
+        alterados += resumo_completos.alterados
+        print(f"Cardápios completos: {resumo_completos}")
+
+    with relatorio.medir(TODOS_CAMPI, ETAPA_METADADOS):
+        if alterados:
+            _salvar_metadados(db, DOCUMENTO_VERSAO_CARDAPIOS, {"versao": firestore.SERVER_TIMESTAMP})
 
-    print(f"Iniciando upload de {len(lista_cardapios)} cardápios para o Firestore...")
+        # Só é executado após o upload, para que uma falha no envio faça o campus ser reprocessado
+        _salvar_metadados(
+            db,
+            DOCUMENTO_IMPRESSOES_PLANILHAS,
+            {
+                campus.value: impressao
+                for campus, impressao in resultado.impressoes_digitais.items()
+                if campus not in resultado.inalterados
+            }
+        )
 
-    for cardapio in lista_cardapios:
-        cardapio_dict = cardapio.model_dump()
-        doc_id = cardapio.id
-        collection_ref.document(doc_id).set(cardapio_dict)
-        print(f" -> Documento '{doc_id}' salvo com sucesso.")
+    if caminho_snapshot is not None and (alterados or forcar or not caminho_snapshot.exists()):
+        with relatorio.medir(TODOS_CAMPI, ETAPA_SNAPSHOT):
+            tamanho = gravar_snapshot(db, caminho_snapshot)
+        print(f"Snapshot gravado em {caminho_snapshot} ({tamanho} bytes)")
 
-    print("\nUpload concluído!")
+    if resultado.falhas:
+        campi = ", ".join(campus.value for campus in resultado.falhas)
+        print(f"Atenção: a extração falhou para os campi: {campi}")
+    return not resultado.falhas
 
 
 if __name__ == "__main__":
-    fazer_upload_cardapios()
+    parser = argparse.ArgumentParser(description="Extrai os cardápios das planilhas e envia para o Firestore.")
+    parser.add_argument(
+        "--forcar",
+        action="store_true",
+        help="Extrai e envia todos os campi, mesmo os que não mudaram desde a última execução, "
+             "e reconstrói os cardápios completos de todo o histórico."
+    )
+    parser.add_argument(
+        "--relatorio",
+        type=Path,
+        help="Grava em JSON o tempo, as chamadas às APIs e os bytes de cada etapa, por campus."
+    )
+    parser.add_argument(
+        "--snapshot",
+        type=Path,
+        help="Grava o snapshot dos cardápios e alimentos lido pela API no modo snapshot (SNAPSHOT_CARDAPIOS)."
+    )
+    parser.add_argument(
+        "--perfil",
+        type=Path,
+        help="Executa sob o cProfile, incluindo as threads de extração, e grava as estatísticas (pstats)."
+    )
+    args = parser.parse_args()
+
+    relatorio = RelatorioExecucao(perfilar=args.perfil is not None)
+    try:
+        sucesso = relatorio.executar(
+            fazer_upload_cardapios, forcar=args.forcar, relatorio=relatorio, caminho_snapshot=args.snapshot
+        )
+    finally:
+        relatorio.finalizar()
+        print(f"\nEtapas da execução ({relatorio.duracao_segundos:.1f}s):\n{relatorio.resumo()}")
+        if args.relatorio:
+            relatorio.salvar(args.relatorio)
+            print(f"Relatório gravado em {args.relatorio}")
+        if args.perfil:
+            relatorio.salvar_perfil(args.perfil)
+            print(f"Perfil gravado em {args.perfil}")
+    sys.exit(0 if sucesso else 1)
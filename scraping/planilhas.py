@@ -1,12 +1,32 @@
 import dataclasses
+import functools
+import hashlib
+import json
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import IntEnum
+from typing import Iterable
 
-from gspread import Worksheet
+from gspread import Client, Worksheet
+from gspread.utils import rowcol_to_a1
 
 from auth import get_gspread_client_service_account
 from modelos import Campus, Fornecedor, TipoRefeicao, Cardapio
+from scraping.correspondencia import METODO_EXATO, CorrespondenciaAlimentos
+from scraping.instrumentacao import (
+    ETAPA_DETECCAO_LAYOUT,
+    ETAPA_EXTRACAO,
+    ETAPA_IMPRESSAO_DIGITAL,
+    ETAPA_LEITURA_CELULAS,
+    ETAPA_OBTER_SHEET,
+    RelatorioExecucao,
+)
+from scraping.layout import DIAS, Bloco, detectar_blocos
+
+# Linhas lidas abaixo do último alimento configurado, para acompanhar linhas inseridas na planilha
+MARGEM_LINHAS_LAYOUT = 20
 
 
 class DiaSemana(IntEnum):
@@ -17,21 +37,92 @@ class DiaSemana(IntEnum):
     SEXTA = 4
 
 
+@dataclasses.dataclass
+class GradePlanilha:
+    """
+    Cópia em memória das células de uma planilha, obtida com um único batch_get
+    e compartilhada por todos os cardápios diários do mesmo campus.
+    Linhas e colunas começam em 1, como no Google Sheets.
+    """
+    valores: dict[tuple[int, int], str] = dataclasses.field(default_factory=dict)
+
+    @staticmethod
+    def agrupar_intervalos(posicoes: Iterable[tuple[int, int]]) -> list[tuple[int, int, int]]:
+        """Agrupa as posições em intervalos contíguos (coluna, linha_inicial, linha_final)."""
+        linhas_por_coluna: dict[int, set[int]] = {}
+        for row, col in posicoes:
+            linhas_por_coluna.setdefault(col, set()).add(row)
+
+        intervalos = []
+        for col, linhas in sorted(linhas_por_coluna.items()):
+            linhas_ordenadas = sorted(linhas)
+            inicio = fim = linhas_ordenadas[0]
+            for row in linhas_ordenadas[1:]:
+                if row != fim + 1:
+                    intervalos.append((col, inicio, fim))
+                    inicio = row
+                fim = row
+            intervalos.append((col, inicio, fim))
+        return intervalos
+
+    @classmethod
+    def carregar(cls, sheet: Worksheet, posicoes: Iterable[tuple[int, int]]) -> "GradePlanilha":
+        intervalos = cls.agrupar_intervalos(posicoes)
+        if not intervalos:
+            return cls()
+
+        faixas_a1 = [f"{rowcol_to_a1(inicio, col)}:{rowcol_to_a1(fim, col)}" for col, inicio, fim in intervalos]
+        respostas = sheet.batch_get(faixas_a1)
+
+        valores = {}
+        for (col, inicio, _), linhas in zip(intervalos, respostas):
+            for deslocamento_linha, linha in enumerate(linhas):
+                for deslocamento_coluna, texto in enumerate(linha):
+                    valores[(inicio + deslocamento_linha, col + deslocamento_coluna)] = texto
+        return cls(valores)
+
+    def obter(self, row: int, col: int) -> str:
+        return self.valores.get((row, col), "")
+
+    def hash_valores(self) -> str:
+        celulas = sorted((row, col, texto) for (row, col), texto in self.valores.items() if texto)
+        return hashlib.sha256(json.dumps(celulas, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+@dataclasses.dataclass
+class CelulaNaoExata:
+    """Célula cujo texto não está, como escrito, no mapeamento do campus. id_alimento é None se não foi mapeada."""
+    row: int
+    col: int
+    texto: str
+    id_alimento: str | None
+    # Texto (normalizado) mais próximo encontrado e a similaridade com ele
+    candidato: str | None
+    confianca: float
+
+
 @dataclasses.dataclass
 class CardapioDiarioPlanilha:
     dia_semana: DiaSemana
     tipo_refeicao: TipoRefeicao
     posicao_alimentos: list[tuple[int, int]]
 
-    def extrair_id_alimentos(self, sheet: Worksheet, id_alimentos_mapa: dict[str, str]):
+    def extrair_id_alimentos(
+            self,
+            grade: GradePlanilha,
+            id_alimentos_mapa: dict[str, str],
+            celulas_nao_exatas: list[CelulaNaoExata] | None = None
+    ):
+        """
+        Textos fora do mapeamento do campus passam por correspondencia_alimentos() (acentos, maiúsculas,
+        pontuação e pequenos erros de digitação). Com celulas_nao_exatas, essas células são registradas
+        nela, inclusive as não mapeadas (sem id_alimento), e cabe a quem chama rejeitá-las; sem ela,
+        uma célula não mapeada levanta RuntimeError.
+        """
         id_alimentos = []
-        all_values = sheet.get_all_values()
 
         for row, col in self.posicao_alimentos:
-            if row - 1 >= len(all_values) or col - 1 >= len(all_values[row - 1]):
-                continue
-
-            texto_na_posicao = all_values[row - 1][col - 1]
+            texto_na_posicao = grade.obter(row, col)
 
             if not texto_na_posicao or texto_na_posicao.strip() == "":
                 continue
@@ -40,22 +131,57 @@ class CardapioDiarioPlanilha:
 
             id_alimento = id_alimentos_mapa.get(texto_na_posicao)
             if id_alimento is None:
-                raise RuntimeError(
-                    f"Texto não mapeado em id_alimentos_mapa: '{texto_na_posicao}' na posição: linha={row}, coluna={col}")
+                correspondencia = correspondencia_alimentos().corresponder(texto_na_posicao, id_alimentos_mapa)
+                id_alimento = correspondencia.id_alimento
+                if celulas_nao_exatas is not None and correspondencia.metodo != METODO_EXATO:
+                    celulas_nao_exatas.append(CelulaNaoExata(
+                        row, col, texto_na_posicao, id_alimento, correspondencia.candidato, round(correspondencia.confianca, 3)
+                    ))
+                if id_alimento is None:
+                    if celulas_nao_exatas is not None:
+                        continue
+                    raise RuntimeError(
+                        f"Texto não mapeado em id_alimentos_mapa: '{texto_na_posicao}' na posição: linha={row}, coluna={col}")
 
             id_alimentos.append(id_alimento)
 
         return id_alimentos
 
     def extrair_data_baseado_na_semana_atual(self):
-        hoje = datetime.now()
-        dia_da_semana_hoje = hoje.weekday()
-        dia_semana_cardapio = self.dia_semana.value
-        segunda = hoje - timedelta(days=dia_da_semana_hoje)
-        dia_do_cardapio = segunda + timedelta(days=dia_semana_cardapio)
+        dia_do_cardapio = segunda_feira_atual() + timedelta(days=self.dia_semana.value)
         return dia_do_cardapio.strftime("%Y-%m-%d")
 
 
+def segunda_feira_atual() -> datetime:
+    hoje = datetime.now()
+    return hoje - timedelta(days=hoje.weekday())
+
+
+@dataclasses.dataclass
+class LayoutPlanilha:
+    """
+    Cardápios diários encontrados pelos marcadores da planilha, na ordem da configuração do campus.
+    detectado indica se todos foram encontrados; divergencias descreve onde diferem da configuração.
+    """
+    cardapios_diarios: list[CardapioDiarioPlanilha]
+    detectado: bool
+    divergencias: list[str] = dataclasses.field(default_factory=list)
+
+
+def _nome_bloco(dia_semana: int, tipo_refeicao: TipoRefeicao) -> str:
+    # DIAS também tem sábado e domingo, que não estão em DiaSemana
+    return f"{DIAS[dia_semana]} {tipo_refeicao.value}"
+
+
+def _descrever_linhas(linhas: list[int]) -> str:
+    if not linhas:
+        return "nenhuma"
+    return ", ".join(
+        str(inicio) if inicio == fim else f"{inicio}-{fim}"
+        for _, inicio, fim in GradePlanilha.agrupar_intervalos((row, 0) for row in linhas)
+    )
+
+
 @dataclasses.dataclass
 class CardapioSemanalPlanilha:
     campus: Campus
@@ -64,13 +190,125 @@ class CardapioSemanalPlanilha:
     fornecedor: Fornecedor
     cardapios_diarios: list[CardapioDiarioPlanilha]
 
-    def obter_sheet(self):
-        client = get_gspread_client_service_account()
+    def obter_sheet(self, client: Client | None = None):
+        if client is None:
+            client = get_gspread_client_service_account()
         spreadsheet = client.open_by_key(self.id_planilha)
         return spreadsheet.sheet1
 
-    def extrair_cardapios(self):
-        sheet = self.obter_sheet()
+    def posicoes_referenciadas(self) -> list[tuple[int, int]]:
+        return [posicao for cardapio_diario in self.cardapios_diarios for posicao in cardapio_diario.posicao_alimentos]
+
+    @property
+    def coluna_itens(self) -> int:
+        return Counter(col for _, col in self.posicoes_referenciadas()).most_common(1)[0][0]
+
+    def posicoes_lidas(self) -> list[tuple[int, int]]:
+        """
+        Retângulo a partir de A1 que cobre os alimentos configurados, as colunas de marcadores à
+        esquerda deles e MARGEM_LINHAS_LAYOUT linhas abaixo; continua sendo um único batch_get.
+        """
+        posicoes = self.posicoes_referenciadas()
+        ultima_linha = max(row for row, _ in posicoes) + MARGEM_LINHAS_LAYOUT
+        ultima_coluna = max(col for _, col in posicoes)
+        return [(row, col) for col in range(1, ultima_coluna + 1) for row in range(1, ultima_linha + 1)]
+
+    def obter_grade(self, client: Client | None = None) -> GradePlanilha:
+        return GradePlanilha.carregar(self.obter_sheet(client), self.posicoes_lidas())
+
+    def _linhas_preenchidas(self, grade: GradePlanilha, linhas: Iterable[int]) -> list[int]:
+        return [row for row in linhas if grade.obter(row, self.coluna_itens).strip()]
+
+    def detectar_layout(self, grade: GradePlanilha) -> LayoutPlanilha:
+        """
+        Deriva os cardápios diários dos marcadores de dia e refeição da grade (ver scraping/layout.py)
+        e descreve em divergencias onde as linhas preenchidas de cada bloco diferem da configuração.
+        A extração continua usando as posições configuradas: o layout detectado serve para avisar
+        que a planilha mudou (por exemplo, uma linha inserida), não para substituí-las.
+        """
+        coluna = self.coluna_itens
+        ultima_linha = max((row for row, _ in grade.valores), default=0)
+        blocos = detectar_blocos(grade.valores, coluna, ultima_linha)
+        if not blocos:
+            return LayoutPlanilha([], False, ["nenhum marcador de dia e refeição encontrado"])
+
+        tipos_por_dia: dict[int, set[TipoRefeicao]] = {}
+        for cardapio_diario in self.cardapios_diarios:
+            tipos_por_dia.setdefault(cardapio_diario.dia_semana.value, set()).add(cardapio_diario.tipo_refeicao)
+
+        divergencias = []
+        detectados: dict[tuple[int, TipoRefeicao], Bloco] = {}
+        for bloco in blocos:
+            tipo_refeicao = bloco.tipo_refeicao
+            if tipo_refeicao is None:
+                # Dia sem marcador de refeição: vale o único tipo configurado para o dia
+                tipos = tipos_por_dia.get(bloco.dia_semana, set())
+                if len(tipos) != 1:
+                    divergencias.append(
+                        f"{DIAS[bloco.dia_semana]} (linhas {_descrever_linhas(list(bloco.linhas))}): sem marcador de refeição"
+                    )
+                    continue
+                tipo_refeicao = next(iter(tipos))
+            chave = (bloco.dia_semana, tipo_refeicao)
+            if chave in detectados:
+                divergencias.append(f"{_nome_bloco(*chave)}: bloco repetido")
+                continue
+            detectados[chave] = bloco
+
+        cardapios_diarios = []
+        completo = True
+        for cardapio_diario in self.cardapios_diarios:
+            nome = _nome_bloco(cardapio_diario.dia_semana.value, cardapio_diario.tipo_refeicao)
+            bloco = detectados.pop((cardapio_diario.dia_semana.value, cardapio_diario.tipo_refeicao), None)
+            if bloco is None:
+                divergencias.append(f"{nome}: bloco não encontrado")
+                completo = False
+                continue
+
+            cardapios_diarios.append(dataclasses.replace(
+                cardapio_diario, posicao_alimentos=[(row, coluna) for row in bloco.linhas]
+            ))
+            esperadas = self._linhas_preenchidas(grade, (row for row, _ in cardapio_diario.posicao_alimentos))
+            encontradas = self._linhas_preenchidas(grade, bloco.linhas)
+            if esperadas != encontradas:
+                divergencias.append(
+                    f"{nome}: linhas {_descrever_linhas(encontradas)} na planilha, "
+                    f"{_descrever_linhas(esperadas)} pela configuração"
+                )
+
+        for chave in detectados:
+            divergencias.append(f"{_nome_bloco(*chave)}: bloco fora da configuração, ignorado")
+
+        return LayoutPlanilha(cardapios_diarios, completo, divergencias)
+
+    def impressao_digital(self, grade: GradePlanilha) -> str:
+        """
+        Identifica o conteúdo que gera os cardápios: os valores da planilha, a semana
+        a que as datas se referem e a configuração de posições e mapeamentos do campus.
+        """
+        configuracao = json.dumps(
+            [
+                sorted(self.id_alimentos_mapa.items()),
+                [(c.dia_semana, c.tipo_refeicao.value, c.posicao_alimentos) for c in self.cardapios_diarios],
+            ],
+            ensure_ascii=False,
+        )
+        partes = [
+            segunda_feira_atual().strftime("%Y-%m-%d"),
+            self.fornecedor.value,
+            hashlib.sha256(configuracao.encode("utf-8")).hexdigest(),
+            grade.hash_valores(),
+        ]
+        return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()
+
+    def extrair_cardapios(self, client: Client | None = None):
+        return self.extrair_cardapios_da_grade(self.obter_grade(client))
+
+    def extrair_cardapios_da_grade(
+            self,
+            grade: GradePlanilha,
+            celulas_nao_exatas: list[CelulaNaoExata] | None = None
+    ):
         cardapios = []
         for cardapio_diario in self.cardapios_diarios:
             cardapio = Cardapio(
@@ -79,11 +317,21 @@ class CardapioSemanalPlanilha:
                 tipo_refeicao=cardapio_diario.tipo_refeicao,
                 data=cardapio_diario.extrair_data_baseado_na_semana_atual(),
                 id_alimentos=cardapio_diario.extrair_id_alimentos(
-                    sheet,
-                    self.id_alimentos_mapa
+                    grade,
+                    self.id_alimentos_mapa,
+                    celulas_nao_exatas
                 )
             )
             cardapios.append(cardapio)
+
+        # Todas as células não mapeadas da planilha são informadas de uma vez, e nenhum cardápio do campus é enviado
+        nao_mapeadas = [celula for celula in celulas_nao_exatas or () if celula.id_alimento is None]
+        if nao_mapeadas:
+            textos = "; ".join(
+                f"'{celula.texto}' (linha={celula.row}, coluna={celula.col}, mais próximo: '{celula.candidato}')"
+                for celula in nao_mapeadas
+            )
+            raise RuntimeError(f"Textos não mapeados em id_alimentos_mapa: {textos}")
         return cardapios
 
 
@@ -618,11 +866,142 @@ TODOS_CARDAPIOS_SEMANAIS_PLANILHAS = [
     sertao_planilha
 ]
 
-def obter_todos_cardapios_dessa_semana():
-    cardapios = []
-    for cardapio_semanal in TODOS_CARDAPIOS_SEMANAIS_PLANILHAS:
-        cardapios.extend(cardapio_semanal.extrair_cardapios())
-    return cardapios
+
+@functools.cache
+def correspondencia_alimentos() -> CorrespondenciaAlimentos:
+    """Compilada uma única vez, com os mapeamentos de todos os campi."""
+    return CorrespondenciaAlimentos(planilha.id_alimentos_mapa for planilha in TODOS_CARDAPIOS_SEMANAIS_PLANILHAS)
+
+
+@dataclasses.dataclass
+class ResultadoExtracao:
+    cardapios: list[Cardapio] = dataclasses.field(default_factory=list)
+    falhas: dict[Campus, Exception] = dataclasses.field(default_factory=dict)
+    impressoes_digitais: dict[Campus, str] = dataclasses.field(default_factory=dict)
+    inalterados: list[Campus] = dataclasses.field(default_factory=list)
+    # Células mapeadas de forma aproximada, para revisão dos mapeamentos
+    celulas_nao_exatas: dict[Campus, list[CelulaNaoExata]] = dataclasses.field(default_factory=dict)
+    # Diferenças entre o layout detectado pelos marcadores e o configurado (ver CardapioSemanalPlanilha.detectar_layout)
+    divergencias_layout: dict[Campus, list[str]] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class ExtracaoCampus:
+    impressao: str
+    # None quando a impressão digital não mudou
+    cardapios: list[Cardapio] | None = None
+    celulas_nao_exatas: list[CelulaNaoExata] = dataclasses.field(default_factory=list)
+    divergencias_layout: list[str] = dataclasses.field(default_factory=list)
+
+
+def _max_workers_padrao(quantidade_planilhas: int) -> int:
+    return int(os.getenv("SCRAPER_MAX_WORKERS", quantidade_planilhas))
+
+
+def _extrair_se_alterado(
+        cardapio_semanal: CardapioSemanalPlanilha,
+        client: Client,
+        impressao_anterior: str | None,
+        relatorio: RelatorioExecucao
+) -> ExtracaoCampus:
+    campus = cardapio_semanal.campus.value
+    with relatorio.medir(campus, ETAPA_OBTER_SHEET):
+        sheet = cardapio_semanal.obter_sheet(client)
+    with relatorio.medir(campus, ETAPA_LEITURA_CELULAS):
+        grade = GradePlanilha.carregar(sheet, cardapio_semanal.posicoes_lidas())
+    with relatorio.medir(campus, ETAPA_IMPRESSAO_DIGITAL):
+        impressao = cardapio_semanal.impressao_digital(grade)
+    if impressao == impressao_anterior:
+        return ExtracaoCampus(impressao)
+    with relatorio.medir(campus, ETAPA_DETECCAO_LAYOUT):
+        layout = cardapio_semanal.detectar_layout(grade)
+    extracao = ExtracaoCampus(impressao, divergencias_layout=layout.divergencias)
+    with relatorio.medir(campus, ETAPA_EXTRACAO):
+        extracao.cardapios = cardapio_semanal.extrair_cardapios_da_grade(grade, extracao.celulas_nao_exatas)
+    return extracao
+
+
+def extrair_todos_cardapios(
+        max_workers: int | None = None,
+        impressoes_anteriores: dict[str, str] | None = None,
+        client: Client | None = None,
+        planilhas: list[CardapioSemanalPlanilha] | None = None,
+        relatorio: RelatorioExecucao | None = None
+) -> ResultadoExtracao:
+    """
+    Extrai os cardápios de todos os campi em paralelo, compartilhando um único gspread.Client.
+    A falha de um campus é registrada em ResultadoExtracao.falhas e não interrompe os demais.
+    Células com texto fora do mapeamento mapeadas por aproximação aparecem em ResultadoExtracao.celulas_nao_exatas;
+    uma célula sem alimento correspondente confiável é uma falha do campus, que não tem a impressão digital
+    registrada e é extraído novamente na próxima execução.
+    Os cardápios diários vêm das posições configuradas para o campus; onde os marcadores de dia e refeição
+    da planilha indicam outro layout, as diferenças ficam em ResultadoExtracao.divergencias_layout.
+    Campi cuja impressão digital coincide com a de impressoes_anteriores (indexadas pelo valor
+    do campus) não são extraídos e aparecem em ResultadoExtracao.inalterados.
+    O client e as planilhas podem ser substituídos, por exemplo pelas planilhas gravadas dos benchmarks.
+    O tempo, as chamadas e os bytes de cada etapa por campus são registrados em relatorio, se informado.
+    """
+    if planilhas is None:
+        planilhas = TODOS_CARDAPIOS_SEMANAIS_PLANILHAS
+    if max_workers is None:
+        max_workers = _max_workers_padrao(len(planilhas))
+    impressoes_anteriores = impressoes_anteriores or {}
+
+    if client is None:
+        client = get_gspread_client_service_account()
+    if relatorio is None:
+        relatorio = RelatorioExecucao()
+    relatorio.instrumentar_client(client)
+    resultado = ResultadoExtracao()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futuros = [
+            (
+                cardapio_semanal.campus,
+                executor.submit(
+                    relatorio.executar,
+                    _extrair_se_alterado,
+                    cardapio_semanal,
+                    client,
+                    impressoes_anteriores.get(cardapio_semanal.campus.value),
+                    relatorio
+                )
+            )
+            for cardapio_semanal in planilhas
+        ]
+
+        for campus, futuro in futuros:
+            try:
+                extracao = futuro.result()
+            except Exception as e:
+                print(f"Erro ao extrair cardápios do campus '{campus.value}': {e}")
+                resultado.falhas[campus] = e
+                relatorio.registrar_falha(campus.value, e)
+                continue
+
+            resultado.impressoes_digitais[campus] = extracao.impressao
+            if extracao.celulas_nao_exatas:
+                resultado.celulas_nao_exatas[campus] = extracao.celulas_nao_exatas
+                relatorio.registrar_celulas_nao_exatas(
+                    campus.value, [dataclasses.asdict(celula) for celula in extracao.celulas_nao_exatas]
+                )
+            if extracao.divergencias_layout:
+                resultado.divergencias_layout[campus] = extracao.divergencias_layout
+                relatorio.registrar_divergencias_layout(campus.value, extracao.divergencias_layout)
+            if extracao.cardapios is None:
+                resultado.inalterados.append(campus)
+            else:
+                resultado.cardapios.extend(extracao.cardapios)
+
+    return resultado
+
+
+def obter_todos_cardapios_dessa_semana(
+        max_workers: int | None = None,
+        client: Client | None = None,
+        planilhas: list[CardapioSemanalPlanilha] | None = None
+):
+    return extrair_todos_cardapios(max_workers, client=client, planilhas=planilhas).cardapios
 
 
 if __name__ == "__main__":
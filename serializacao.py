@@ -0,0 +1,50 @@
+"""
+Serialização direta para JSON dos documentos lidos do Firestore.
+Os documentos já foram validados pelo scraper ao serem gravados, então as rotas de leitura
+os convertem em bytes sem passar pelos modelos Pydantic. A saída é idêntica à de
+CardapioCompleto/Alimento.model_dump_json (mesma ordem de campos e formato compacto).
+"""
+from typing import Iterable
+
+import orjson
+
+from modelos import Alimento
+
+CAMPOS_ALIMENTO = tuple(Alimento.model_fields)
+CAMPOS_CARDAPIO = ("campus", "fornecedor", "tipo_refeicao", "data")
+
+
+def id_do_cardapio(cardapio: dict) -> str:
+    # Mesma regra de Cardapio.id
+    return f"{cardapio['campus']}_{cardapio['data']}_{cardapio['tipo_refeicao']}"
+
+
+def serializar_alimento(alimento: dict) -> bytes:
+    return orjson.dumps({campo: alimento.get(campo) for campo in CAMPOS_ALIMENTO})
+
+
+def serializar_cardapio(cardapio: dict, alimentos: Iterable[bytes]) -> bytes:
+    """Monta o JSON de um CardapioCompleto a partir dos campos do cardápio e dos fragmentos JSON dos alimentos."""
+    cabecalho = orjson.dumps({campo: cardapio[campo] for campo in CAMPOS_CARDAPIO})
+    return b"".join((
+        cabecalho[:-1],
+        b',"id_alimentos":[',
+        b",".join(alimentos),
+        b'],"id":',
+        orjson.dumps(id_do_cardapio(cardapio)),
+        b"}",
+    ))
+
+
+def serializar_cardapio_completo(cardapio: dict) -> bytes:
+    """Serializa um documento de cardapios_completos, que já traz os alimentos embutidos."""
+    return serializar_cardapio(cardapio, (serializar_alimento(alimento) for alimento in cardapio["id_alimentos"]))
+
+
+def serializar_lista(itens: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(itens) + b"]"
+
+
+def serializar_objeto(pares: Iterable[tuple[str, bytes]]) -> bytes:
+    """Monta um objeto JSON a partir de chaves e valores já serializados."""
+    return b"{" + b",".join(orjson.dumps(chave) + b":" + valor for chave, valor in pares) + b"}"
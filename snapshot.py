@@ -0,0 +1,381 @@
+"""
+Snapshot somente leitura dos cardápios e alimentos, gravado pelo scraper e lido pela API com mmap.
+
+Formato (versão VERSAO_FORMATO, inteiros little-endian sem sinal):
+  cabeçalho   MAGICO, versão do formato (4 bytes) e tamanho dos metadados (4 bytes)
+  metadados   JSON com gerado_em, os valores de campus, tipo_refeicao e fornecedor (em ordem alfabética,
+              de modo que a ordem dos códigos é a dos textos) e a posição e a quantidade de cada seção,
+              contadas a partir do fim dos metadados
+  cardapios   registros de tamanho fixo (data, códigos, posição e tamanho do JSON), na ordem das
+              listagens (ORDEM_CARDAPIOS); as consultas por período são bisseções nesta seção
+  por_id      números dos registros de cardapios, na ordem dos IDs
+  por_campus  para cada campus, números dos seus registros, na ordem das listagens
+  alimentos   registros (posição e tamanho do ID e do JSON), na ordem dos IDs
+  conteudos   JSON de cada CardapioCompleto e de cada Alimento, exatamente como enviados pelas rotas
+
+O arquivo é mapeado com ACCESS_READ: os processos do uvicorn compartilham as mesmas páginas pelo cache
+do sistema operacional, a abertura não lê o arquivo inteiro e nenhuma rota consulta o Firestore.
+O scraper grava em um arquivo temporário e o renomeia sobre o anterior, de modo que uma API com o
+arquivo antigo mapeado continua lendo-o até reabri-lo (ver SnapshotCardapios.recarregar_se_alterado).
+
+A execução agendada do scraper (.github/workflows/run_scraper.yml) publica o arquivo como o artefato
+cardapios-snapshot. Cada réplica da API o baixa periodicamente para um diretório no mesmo sistema de
+arquivos de SNAPSHOT_CARDAPIOS e o renomeia sobre ele, por exemplo:
+    id=$(gh run list -R <repositório> -w run_scraper.yml -s success -L 1 --json databaseId -q ".[0].databaseId")
+    gh run download "$id" -R <repositório> -n cardapios-snapshot -D "$(dirname "$SNAPSHOT_CARDAPIOS")/novo"
+    mv "$(dirname "$SNAPSHOT_CARDAPIOS")/novo/cardapios.snapshot" "$SNAPSHOT_CARDAPIOS"
+"""
+import asyncio
+import bisect
+import dataclasses
+import json
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence
+
+from paginacao import MAXIMO_CHAVE, ORDEM_CARDAPIOS, chave_de_ordenacao
+from serializacao import id_do_cardapio, serializar_alimento, serializar_cardapio
+
+MAGICO = b"RESUNSNP"
+VERSAO_FORMATO = 1
+
+_CABECALHO = struct.Struct("<8sII")
+# data (AAAA-MM-DD), campus, tipo_refeicao, fornecedor, posição e tamanho do JSON em conteudos
+_CARDAPIO = struct.Struct("<10sBBBII")
+_NUMERO = struct.Struct("<I")
+# posição e tamanho do ID, posição e tamanho do JSON, ambos em conteudos
+_ALIMENTO = struct.Struct("<IIII")
+
+
+def escrever_snapshot(
+        caminho: Path,
+        cardapios: Iterable[dict],
+        alimentos: Iterable[dict],
+        gerado_em: Optional[datetime] = None
+) -> int:
+    """
+    Grava o snapshot a partir dos documentos das coleções cardapios e alimentos e retorna o tamanho em bytes.
+    Como em consultas.completar, IDs de alimentos ausentes da coleção são omitidos dos cardápios.
+    """
+    gerado_em = gerado_em or datetime.now(timezone.utc)
+    alimentos_map = {alimento["id"]: serializar_alimento(alimento) for alimento in alimentos}
+    por_id_cardapio = {id_do_cardapio(cardapio): cardapio for cardapio in cardapios}
+    ordenados = sorted(por_id_cardapio.values(), key=lambda cardapio: chave_de_ordenacao(cardapio, ORDEM_CARDAPIOS))
+
+    valores = {
+        campo: sorted({cardapio[campo] for cardapio in ordenados})
+        for campo in ("campus", "tipo_refeicao", "fornecedor")
+    }
+    codigos = {campo: {valor: codigo for codigo, valor in enumerate(lista)} for campo, lista in valores.items()}
+
+    conteudos = bytearray()
+
+    def guardar(conteudo: bytes) -> tuple[int, int]:
+        posicao = len(conteudos)
+        conteudos.extend(conteudo)
+        return posicao, len(conteudo)
+
+    secao_cardapios = bytearray()
+    for cardapio in ordenados:
+        json_cardapio = serializar_cardapio(
+            cardapio, (alimentos_map[id] for id in cardapio["id_alimentos"] if id in alimentos_map)
+        )
+        secao_cardapios += _CARDAPIO.pack(
+            cardapio["data"].encode("ascii"),
+            codigos["campus"][cardapio["campus"]],
+            codigos["tipo_refeicao"][cardapio["tipo_refeicao"]],
+            codigos["fornecedor"][cardapio["fornecedor"]],
+            *guardar(json_cardapio)
+        )
+
+    ids = [id_do_cardapio(cardapio) for cardapio in ordenados]
+    secao_por_id = b"".join(_NUMERO.pack(numero) for numero in sorted(range(len(ids)), key=ids.__getitem__))
+    secoes_por_campus = {
+        campus: b"".join(_NUMERO.pack(numero) for numero, cardapio in enumerate(ordenados) if cardapio["campus"] == campus)
+        for campus in valores["campus"]
+    }
+
+    secao_alimentos = bytearray()
+    for id, json_alimento in sorted(alimentos_map.items()):
+        secao_alimentos += _ALIMENTO.pack(*guardar(id.encode("utf-8")), *guardar(json_alimento))
+
+    partes = []
+    posicao = 0
+
+    def secao(conteudo: bytes, quantidade: int) -> list[int]:
+        nonlocal posicao
+        partes.append(conteudo)
+        inicio, posicao = posicao, posicao + len(conteudo)
+        return [inicio, quantidade]
+
+    metadados = {
+        "gerado_em": gerado_em.isoformat(),
+        **valores,
+        "secoes": {
+            "cardapios": secao(secao_cardapios, len(ordenados)),
+            "por_id": secao(secao_por_id, len(ordenados)),
+            "por_campus": {
+                campus: secao(conteudo, len(conteudo) // _NUMERO.size) for campus, conteudo in secoes_por_campus.items()
+            },
+            "alimentos": secao(secao_alimentos, len(alimentos_map)),
+            "conteudos": secao(bytes(conteudos), len(conteudos)),
+        },
+    }
+    json_metadados = json.dumps(metadados, ensure_ascii=False).encode("utf-8")
+
+    caminho = Path(caminho)
+    temporario = caminho.with_name(f".{caminho.name}.tmp")
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(_CABECALHO.pack(MAGICO, VERSAO_FORMATO, len(json_metadados)))
+        arquivo.write(json_metadados)
+        for parte in partes:
+            arquivo.write(parte)
+    os.replace(temporario, caminho)
+    return _CABECALHO.size + len(json_metadados) + posicao
+
+
+class _CardapioDoSnapshot(dict):
+    """Cardápio lido do snapshot, que guarda o número do registro para obter o JSON sem nova bisseção."""
+    __slots__ = ("numero",)
+
+
+class _Registros(Sequence):
+    """Registros de tamanho fixo de uma seção do arquivo mapeado, desempacotados sob demanda."""
+
+    def __init__(self, buffer: mmap.mmap, inicio: int, quantidade: int, estrutura: struct.Struct):
+        self._buffer = buffer
+        self._inicio = inicio
+        self._quantidade = quantidade
+        self._estrutura = estrutura
+
+    def __len__(self) -> int:
+        return self._quantidade
+
+    def __getitem__(self, posicao: int) -> tuple:
+        if not 0 <= posicao < self._quantidade:
+            raise IndexError(posicao)
+        return self._estrutura.unpack_from(self._buffer, self._inicio + posicao * self._estrutura.size)
+
+
+class _NumerosRegistros(_Registros):
+    def __init__(self, buffer: mmap.mmap, inicio: int, quantidade: int):
+        super().__init__(buffer, inicio, quantidade, _NUMERO)
+
+    def __getitem__(self, posicao: int) -> int:
+        return super().__getitem__(posicao)[0]
+
+
+@dataclasses.dataclass
+class _ArquivoMapeado:
+    buffer: mmap.mmap
+    # (st_ino, st_mtime_ns, st_size) do arquivo aberto, para perceber quando ele é substituído
+    identificacao: tuple[int, int, int]
+    gerado_em: datetime
+    campi: list[str]
+    tipos_refeicao: list[str]
+    fornecedores: list[str]
+    cardapios: _Registros
+    por_id: _NumerosRegistros
+    por_campus: dict[str, _NumerosRegistros]
+    alimentos: _Registros
+    inicio_conteudos: int
+
+    @classmethod
+    def abrir(cls, caminho: Path) -> "_ArquivoMapeado":
+        with open(caminho, "rb") as arquivo:
+            estado = os.fstat(arquivo.fileno())
+            buffer = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if len(buffer) < _CABECALHO.size:
+                raise ValueError(f"{caminho} não é um snapshot de cardápios")
+            magico, versao, tamanho_metadados = _CABECALHO.unpack_from(buffer, 0)
+            if magico != MAGICO:
+                raise ValueError(f"{caminho} não é um snapshot de cardápios")
+            if versao != VERSAO_FORMATO:
+                raise ValueError(f"Versão do snapshot não suportada: {versao} (esperada: {VERSAO_FORMATO})")
+            metadados = json.loads(buffer[_CABECALHO.size:_CABECALHO.size + tamanho_metadados])
+        except Exception:
+            buffer.close()
+            raise
+
+        base = _CABECALHO.size + tamanho_metadados
+        secoes = metadados["secoes"]
+        return cls(
+            buffer=buffer,
+            identificacao=(estado.st_ino, estado.st_mtime_ns, estado.st_size),
+            gerado_em=datetime.fromisoformat(metadados["gerado_em"]),
+            campi=metadados["campus"],
+            tipos_refeicao=metadados["tipo_refeicao"],
+            fornecedores=metadados["fornecedor"],
+            cardapios=_Registros(buffer, base + secoes["cardapios"][0], secoes["cardapios"][1], _CARDAPIO),
+            por_id=_NumerosRegistros(buffer, base + secoes["por_id"][0], secoes["por_id"][1]),
+            por_campus={
+                campus: _NumerosRegistros(buffer, base + inicio, quantidade)
+                for campus, (inicio, quantidade) in secoes["por_campus"].items()
+            },
+            alimentos=_Registros(buffer, base + secoes["alimentos"][0], secoes["alimentos"][1], _ALIMENTO),
+            inicio_conteudos=base + secoes["conteudos"][0],
+        )
+
+    def conteudo(self, posicao: int, tamanho: int) -> bytes:
+        inicio = self.inicio_conteudos + posicao
+        return self.buffer[inicio:inicio + tamanho]
+
+    def cardapio(self, numero: int) -> _CardapioDoSnapshot:
+        data, campus, tipo_refeicao, fornecedor, _, _ = self.cardapios[numero]
+        cardapio = _CardapioDoSnapshot(
+            campus=self.campi[campus],
+            fornecedor=self.fornecedores[fornecedor],
+            tipo_refeicao=self.tipos_refeicao[tipo_refeicao],
+            data=data.decode("ascii"),
+        )
+        cardapio["id"] = id_do_cardapio(cardapio)
+        cardapio.numero = numero
+        return cardapio
+
+    def chave(self, numero: int) -> tuple[str, str, str]:
+        data, campus, tipo_refeicao, _, _, _ = self.cardapios[numero]
+        return data.decode("ascii"), self.campi[campus], self.tipos_refeicao[tipo_refeicao]
+
+    def id(self, numero: int) -> str:
+        data, campus, tipo_refeicao = self.chave(numero)
+        return f"{campus}_{data}_{tipo_refeicao}"
+
+    def numero_do_id(self, id_cardapio: str) -> Optional[int]:
+        posicao = bisect.bisect_left(self.por_id, id_cardapio, key=self.id)
+        if posicao < len(self.por_id) and self.id(self.por_id[posicao]) == id_cardapio:
+            return self.por_id[posicao]
+        return None
+
+
+class SnapshotCardapios:
+    """
+    Atende as mesmas leituras que IndiceCardapios (obter, filtrar, atualizado_em...) a partir do snapshot
+    mapeado em memória. Os cardápios retornados trazem apenas os campos de listagem e o ID; o JSON
+    completo de cada um, já com os alimentos, vem de conteudos. Sempre pronto depois de aberto.
+    """
+
+    def __init__(
+            self,
+            caminho: Path,
+            intervalo_atualizacao: Optional[float] = None,
+    ):
+        self.caminho = Path(caminho)
+        if intervalo_atualizacao is None:
+            intervalo_atualizacao = float(os.getenv("SNAPSHOT_INTERVALO_ATUALIZACAO", 60))
+        self.intervalo_atualizacao = intervalo_atualizacao
+        self._arquivo = _ArquivoMapeado.abrir(self.caminho)
+        # Chamado (no event loop) quando um novo snapshot é carregado
+        self.ao_alterar: Optional[Callable[[], None]] = None
+
+    @property
+    def pronto(self) -> bool:
+        return True
+
+    @property
+    def quantidade(self) -> int:
+        return len(self._arquivo.cardapios)
+
+    @property
+    def gerado_em(self) -> datetime:
+        return self._arquivo.gerado_em
+
+    @property
+    def versao(self) -> str:
+        return self._arquivo.gerado_em.isoformat()
+
+    def recarregar_se_alterado(self) -> bool:
+        """Reabre o arquivo se ele foi substituído; um snapshot inválido é ignorado e o atual é mantido."""
+        try:
+            estado = os.stat(self.caminho)
+        except OSError as e:
+            print(f"Não foi possível verificar o snapshot de cardápios: {e}")
+            return False
+        if (estado.st_ino, estado.st_mtime_ns, estado.st_size) == self._arquivo.identificacao:
+            return False
+
+        try:
+            novo = _ArquivoMapeado.abrir(self.caminho)
+        except Exception as e:
+            print(f"Não foi possível carregar o novo snapshot de cardápios: {e}")
+            return False
+        # As leituras copiam os bytes do mapeamento, então o anterior pode ser fechado logo após a troca
+        anterior, self._arquivo = self._arquivo, novo
+        anterior.buffer.close()
+        return True
+
+    async def executar_atualizacao_periodica(self):
+        while True:
+            await asyncio.sleep(self.intervalo_atualizacao)
+            if self.recarregar_se_alterado() and self.ao_alterar is not None:
+                self.ao_alterar()
+
+    def parar(self):
+        self._arquivo.buffer.close()
+
+    def obter(self, id_cardapio: str) -> Optional[dict]:
+        numero = self._arquivo.numero_do_id(id_cardapio)
+        return None if numero is None else self._arquivo.cardapio(numero)
+
+    def atualizado_em(self, id_cardapio: str) -> Optional[datetime]:
+        return self._arquivo.gerado_em
+
+    def conteudos(self, cardapios: list[dict]) -> list[bytes]:
+        """JSON de cada CardapioCompleto, na ordem informada; os cardápios devem ter vindo deste snapshot."""
+        arquivo = self._arquivo
+        conteudos = []
+        for cardapio in cardapios:
+            numero = getattr(cardapio, "numero", None)
+            if numero is None:
+                numero = arquivo.numero_do_id(cardapio["id"])
+            *_, posicao, tamanho = arquivo.cardapios[numero]
+            conteudos.append(arquivo.conteudo(posicao, tamanho))
+        return conteudos
+
+    def alimentos(self) -> list[tuple[str, bytes]]:
+        """Pares (ID, JSON) de todos os alimentos, na ordem dos IDs."""
+        arquivo = self._arquivo
+        return [
+            (arquivo.conteudo(posicao_id, tamanho_id).decode("utf-8"), arquivo.conteudo(posicao, tamanho))
+            for posicao_id, tamanho_id, posicao, tamanho in arquivo.alimentos
+        ]
+
+    def filtrar(
+            self,
+            campus: tuple[str, ...] = (),
+            tipo_refeicao: tuple[str, ...] = (),
+            fornecedor: tuple[str, ...] = (),
+            data_inicio: Optional[str] = None,
+            data_fim: Optional[str] = None,
+            limite: Optional[int] = None,
+            inicio: Optional[tuple[str, str, str]] = None
+    ) -> list[dict]:
+        """Mesma semântica de IndiceCardapios.filtrar; com um único campus, percorre só os registros dele."""
+        arquivo = self._arquivo
+        if len(campus) == 1:
+            numeros = arquivo.por_campus.get(campus[0], ())
+        else:
+            numeros = range(len(arquivo.cardapios))
+
+        primeira = bisect.bisect_left(numeros, (data_inicio,), key=arquivo.chave) if data_inicio else 0
+        if inicio:
+            primeira = max(primeira, bisect.bisect_right(numeros, (*inicio, MAXIMO_CHAVE), key=arquivo.chave))
+        ultima = bisect.bisect_right(numeros, (data_fim, MAXIMO_CHAVE), key=arquivo.chave) if data_fim else len(numeros)
+
+        resultado = []
+        for posicao in range(primeira, ultima):
+            cardapio = arquivo.cardapio(numeros[posicao])
+            if campus and cardapio["campus"] not in campus:
+                continue
+            if tipo_refeicao and cardapio["tipo_refeicao"] not in tipo_refeicao:
+                continue
+            if fornecedor and cardapio["fornecedor"] not in fornecedor:
+                continue
+            resultado.append(cardapio)
+            if limite is not None and len(resultado) == limite:
+                break
+        return resultado